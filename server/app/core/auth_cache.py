@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import settings
+from app.models.user import UserSnapshot
+
+
+class AuthCache:
+    """
+    Per-process cache for request authentication.
+
+    - claims: token -> user id, kept until the token expires, so the same
+      token is only HMAC-verified once.
+    - users: user id -> UserSnapshot, kept `user_ttl` seconds, so resolving
+      the caller does not need a database round trip.
+
+    Both are bounded LRUs. Changes made through this process (password,
+    email, deactivation) call invalidate_user(); other workers pick them up
+    when the snapshot expires.
+    """
+
+    def __init__(self, max_tokens: int, max_users: int, user_ttl: float):
+        self.max_tokens = max_tokens
+        self.max_users = max_users
+        self.user_ttl = user_ttl
+        self._claims: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._users: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_user_id(self, token: str) -> Optional[int]:
+        item = self._claims.get(token)
+        if item is None:
+            return None
+        expires, user_id = item
+        if expires <= time.time():
+            del self._claims[token]
+            return None
+        self._claims.move_to_end(token)
+        return user_id
+
+    def set_user_id(self, token: str, user_id: int, expires: float) -> None:
+        self._claims[token] = (expires, user_id)
+        self._claims.move_to_end(token)
+        while len(self._claims) > self.max_tokens:
+            self._claims.popitem(last=False)
+
+    def get_user(self, user_id: int) -> Optional[UserSnapshot]:
+        item = self._users.get(user_id)
+        if item is None or item[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self._users.move_to_end(user_id)
+        self.hits += 1
+        return item[1]
+
+    def set_user(self, user: UserSnapshot) -> None:
+        self._users[user.id] = (time.monotonic() + self.user_ttl, user)
+        self._users.move_to_end(user.id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "tokens": len(self._claims),
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+auth_cache = AuthCache(
+    max_tokens=settings.AUTH_TOKEN_CACHE_SIZE,
+    max_users=settings.AUTH_USER_CACHE_SIZE,
+    user_ttl=settings.AUTH_USER_CACHE_TTL,
+)
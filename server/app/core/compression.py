@@ -0,0 +1,82 @@
+import zlib
+from typing import Any, Optional
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from app.core.config import settings
+
+try:
+    import zstandard
+except ImportError:  # Optional: zlib is used when zstandard is not installed
+    zstandard = None
+
+# First byte of every stored value: how the rest is encoded
+RAW = 0x00
+ZLIB = 0x01
+ZSTD = 0x02
+
+
+def _codec() -> Optional[int]:
+    if settings.HISTORY_COMPRESSION == "none":
+        return None
+    if settings.HISTORY_COMPRESSION == "zstd" and zstandard is not None:
+        return ZSTD
+    return ZLIB
+
+
+CODEC = _codec()
+if settings.HISTORY_COMPRESSION == "zstd" and zstandard is None:
+    print("WARNING: HISTORY_COMPRESSION=zstd but zstandard is not installed, using zlib")
+
+
+def compress_text(value: str) -> bytes:
+    """
+    Encode `value` as a version byte followed by its UTF-8 bytes, compressed
+    when it is at least HISTORY_COMPRESS_MIN_BYTES long and compression
+    actually makes it smaller.
+    """
+    raw = value.encode("utf-8")
+    if CODEC is not None and len(raw) >= settings.HISTORY_COMPRESS_MIN_BYTES:
+        if CODEC == ZSTD:
+            packed = zstandard.ZstdCompressor().compress(raw)
+        else:
+            packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            return bytes([CODEC]) + packed
+    return bytes([RAW]) + raw
+
+
+def decompress_text(value: Any) -> str:
+    if isinstance(value, str):
+        return value  # Written before compression was enabled
+    value = bytes(value)
+    version, body = value[0], value[1:]
+    if version == RAW:
+        return body.decode("utf-8")
+    if version == ZLIB:
+        return zlib.decompress(body).decode("utf-8")
+    if version == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd compressed text")
+        return zstandard.ZstdDecompressor().decompress(body).decode("utf-8")
+    raise ValueError(f"Unknown compressed text version: {version}")
+
+
+class CompressedText(TypeDecorator):
+    """
+    Text column stored as compressed bytes (see compress_text).
+    Values are compressed on write and decompressed on read, so models keep
+    working with plain `str`. Columns of this type cannot be filtered on
+    in SQL (LIKE, =); the history search index exists for that.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[str], dialect) -> Optional[bytes]:
+        if value is None:
+            return None
+        return compress_text(value)
+
+    def process_result_value(self, value: Any, dialect) -> Optional[str]:
+        if value is None:
+            return None
+        return decompress_text(value)
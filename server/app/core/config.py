@@ -1,14 +1,125 @@
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     GEMINI_API_KEY: str
     SECRET_KEY: str
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: str = ""  # Derived from DATABASE_URL when empty (aiosqlite / asyncpg)
+
+    # Database engine profile
+    DB_POOL_SIZE: int = 5  # Connections kept open per engine
+    DB_MAX_OVERFLOW: int = 10  # Extra connections allowed under load
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Seconds before a connection is replaced (server databases)
+    DB_POOL_PRE_PING: bool = True  # Check connections before use (server databases)
+    SQLITE_WAL: bool = True  # Write-ahead log: readers no longer block on writes
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Wait for locks instead of failing with "database is locked"
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # Bytes of the file memory-mapped
+    SQLITE_CACHE_SIZE: int = -64000  # Page cache; negative values are KiB (about 64 MB)
     ENV: str = "development"  # development | production
     ALLOWED_ORIGINS: str = "*"  # Allow all origins (use specific domains in production)
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 30  # 30 days
     ENCRYPTION_KEY: str
 
+    # Quotas, per user id (per IP for guests)
+    QUOTA_BACKEND: str = "sqlite"  # sqlite (shared by all workers on the host) | local (per worker)
+    QUOTA_DB: str = "quota.db"  # SQLite file used by the sqlite backend
+    GUEST_MAX_CHARS: int = 250  # Characters per text
+    USER_MAX_CHARS: int = 4000
+    GUEST_REQUESTS_PER_MINUTE: int = 10  # AI requests (/tools), sliding window
+    USER_REQUESTS_PER_MINUTE: int = 30
+    GUEST_DAILY_CHARS: int = 20_000  # Characters submitted per day (UTC)
+    USER_DAILY_CHARS: int = 1_000_000
+    GUEST_DAILY_TOKENS: int = 10_000  # Estimated input + output tokens per day (UTC)
+    USER_DAILY_TOKENS: int = 500_000
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Cost factor; existing hashes are upgraded on the next login when it changes
+    HASH_WORKERS: int = 2  # Threads dedicated to bcrypt, per worker process
+    HASH_MAX_PENDING: int = 32  # Hash/verify calls queued or running before new ones get a 503
+
+    # Authentication cache
+    AUTH_TOKEN_CACHE_SIZE: int = 10000  # Verified tokens kept (their claims), per worker
+    AUTH_USER_CACHE_SIZE: int = 10000  # User snapshots kept, per worker
+    AUTH_USER_CACHE_TTL: float = 30.0  # Seconds before a snapshot is re-read (bounds staleness across workers)
+
+    # SystemConfig cache
+    CONFIG_CACHE_TTL: int = 300  # Seconds a decrypted value is kept in memory
+    CONFIG_VERSION_CHECK_SECONDS: int = 10  # How often workers look for changes made elsewhere
+
+    # Gemini HTTP client
+    GEMINI_MAX_CONNECTIONS: int = 100  # Pooled connections shared by the whole worker
+    GEMINI_TIMEOUT: float = 30.0  # Seconds per request
+    GEMINI_MAX_RETRIES: int = 3
+
+    # Gemini rate scheduler (token bucket)
+    GEMINI_RPM: int = 15  # Requests per minute
+    GEMINI_TPM: int = 1_000_000  # Tokens per minute
+    GEMINI_RATE_BURST: int = 5  # Requests allowed back-to-back after an idle period
+    GEMINI_RATE_BACKEND: str = "local"  # local (per worker) | sqlite (shared by all workers)
+    GEMINI_RATE_DB: str = "rate_limit.db"  # SQLite file used by the sqlite backend
+
+    # Gemini queues: share of the rate while several are waiting, and the
+    # longest a call may wait before it is rejected (503)
+    GEMINI_QUEUE_USER_WEIGHT: int = 6  # Logged-in users
+    GEMINI_QUEUE_USER_MAX_WAIT: float = 30.0
+    GEMINI_QUEUE_GUEST_WEIGHT: int = 2
+    GEMINI_QUEUE_GUEST_MAX_WAIT: float = 10.0
+    GEMINI_QUEUE_BACKGROUND_WEIGHT: int = 1  # Batch endpoints and background jobs
+    GEMINI_QUEUE_BACKGROUND_MAX_WAIT: float = 120.0
+
+    # Gemini circuit breaker: fail fast while the upstream is unhealthy
+    GEMINI_BREAKER_WINDOW: float = 60.0  # Seconds of recent calls considered
+    GEMINI_BREAKER_MIN_CALLS: int = 10  # Calls in the window before it can open
+    GEMINI_BREAKER_FAILURE_RATE: float = 0.5  # Share of failed (or of slow) calls that opens it
+    GEMINI_BREAKER_OPEN_SECONDS: float = 30.0  # Calls are refused this long before trial calls
+    GEMINI_BREAKER_PROBES: int = 3  # Successful trial calls needed to close it again
+    GEMINI_SLOW_CALL_SECONDS: float = 15.0  # Slower calls count as slow (breaker) and back off concurrency
+
+    # Gemini adaptive concurrency (AIMD), per worker
+    GEMINI_CONCURRENCY_INITIAL: int = 8  # Calls in flight at startup
+    GEMINI_CONCURRENCY_MIN: int = 1
+    GEMINI_CONCURRENCY_MAX: int = 64
+    GEMINI_CONCURRENCY_BACKOFF: float = 0.5  # Limit multiplier after a 429, an error or a slow call
+
+    # Chunked AI work
+    TRANSLATE_MAX_CONCURRENCY: int = 4  # Chunks of one document translated at the same time
+    SUMMARIZE_MAX_CONCURRENCY: int = 4  # Chunk summaries of one document run at the same time
+    SUMMARY_FAN_IN: int = 8  # Partial summaries merged per reduce call
+    SUMMARY_MAX_DEPTH: int = 4  # Max levels of the map-reduce tree (map counts as 1)
+
+    # Batch endpoints
+    BATCH_MAX_ITEMS: int = 100  # Items per request
+    BATCH_ITEM_MAX_CHARS: int = 2000  # Larger items are processed on their own
+    BATCH_PROMPT_MAX_CHARS: int = 12000  # Text packed into one model call
+    BATCH_PROMPT_MAX_ITEMS: int = 40  # Items packed into one model call
+    BATCH_MAX_CONCURRENCY: int = 4  # Packed calls of one request running at the same time
+
+    # History
+    HISTORY_DELETE_BATCH_SIZE: int = 5000  # Rows per DELETE when clearing history
+    HISTORY_WRITE_BEHIND: bool = True  # Record history in the background, off the request path
+    HISTORY_QUEUE_SIZE: int = 10000  # Rows waiting to be written before requests wait
+    HISTORY_BATCH_SIZE: int = 200  # Rows per INSERT
+    HISTORY_FLUSH_INTERVAL: float = 0.5  # Max seconds a row waits for its batch
+    HISTORY_EXPORT_BATCH_SIZE: int = 500  # Rows fetched (and serialized) at a time by /history/export
+    HISTORY_COMPRESSION: Literal["zlib", "zstd", "none"] = "zlib"  # Codec for stored texts (zstd needs zstandard)
+    HISTORY_COMPRESS_MIN_BYTES: int = 256  # Shorter texts are stored uncompressed
+    HISTORY_PREVIEW_CHARS: int = 200  # Length of the uncompressed preview used by light list views
+
+    # Background jobs (?async=true)
+    JOB_WORKERS: int = 4  # Jobs executed at the same time by each worker process
+    JOB_POLL_INTERVAL: float = 2.0  # Seconds between status checks of the events stream
+    JOB_STALE_SECONDS: int = 15 * 60  # Running jobs older than this are retried on startup
+    JOB_RETENTION_HOURS: int = 24 * 7  # Finished jobs are pruned after this
+
+    # AI response cache
+    AI_CACHE_MAX_ENTRIES: int = 2048
+    AI_CACHE_MAX_CHARS: int = 20_000_000  # Total characters held in memory
+    AI_CACHE_TTL: int = 60 * 60 * 24 * 7  # 7 days
+    AI_CACHE_PERSISTENT: bool = False  # Also store results in the database
+
     model_config = SettingsConfigDict(env_file=".env")
 
 settings = Settings()
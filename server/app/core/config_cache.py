@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.core.security_encryption import encryption_service
+from app.models.system_config import SystemConfig
+
+
+class SystemConfigCache:
+    """
+    In-process cache of decrypted SystemConfig values.
+
+    Entries expire after `ttl` seconds and are dropped explicitly when
+    this process writes a new value. Other workers notice a change through
+    the version stamp, max(SystemConfig.updated_at), which is re-read at
+    most every `version_check_interval` seconds instead of on every call.
+    While the stamp is unchanged, cached values stay valid until their TTL:
+    only a new version or an expired entry is read and decrypted again.
+    """
+
+    def __init__(self, ttl: float, version_check_interval: float):
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        self._values: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._version: Optional[datetime] = None
+        self._version_checked = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key: str, now: float) -> Tuple[bool, Optional[str]]:
+        item = self._values.get(key)
+        if item is None or item[0] < now:
+            return False, None
+        return True, item[1]
+
+    def _lookup(self, key: str) -> Tuple[bool, Optional[str]]:
+        now = time.monotonic()
+        if now - self._version_checked > self.version_check_interval:
+            return False, None  # Version stamp must be re-checked first
+        return self._cached(key, now)
+
+    def _check_version(self, session: Session) -> None:
+        version = session.exec(select(func.max(SystemConfig.updated_at))).one()
+        if version != self._version:
+            self._values.clear()
+            self._version = version
+        self._version_checked = time.monotonic()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the decrypted value of `key`, or None if it is not set."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+
+            with Session(engine) as session:
+                if time.monotonic() - self._version_checked > self.version_check_interval:
+                    self._check_version(session)
+                    # Unchanged version: the entry (if not expired) is still valid
+                    found, value = self._cached(key, time.monotonic())
+                    if found:
+                        self.hits += 1
+                        return value
+
+                self.misses += 1
+                config = session.get(SystemConfig, key)
+                value = encryption_service.decrypt(config.value) if config else None
+            self._values[key] = (time.monotonic() + self.ttl, value)
+            return value
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Like get(), but keeps the DB round trip of a miss off the event loop."""
+        # Lock-free read: never block the event loop behind a thread doing a miss
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "version": self._version.isoformat() if self._version else None,
+        }
+
+
+system_config_cache = SystemConfigCache(
+    ttl=settings.CONFIG_CACHE_TTL,
+    version_check_interval=settings.CONFIG_VERSION_CHECK_SECONDS,
+)
@@ -1,11 +1,132 @@
+from typing import Any, AsyncGenerator, Dict, List
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
 
-# check_same_thread=False is required for SQLite interactions across threads
-engine = create_engine(
-    settings.DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async drivers for the sync URLs used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url() -> str:
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(settings.DATABASE_URL)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+    return settings.DATABASE_URL
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def is_memory_sqlite(url: str) -> bool:
+    return is_sqlite(url) and make_url(url).database in (None, "", ":memory:")
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    Engine keyword arguments for the configured profile.
+    - Server databases: sized connection pool with recycling and pre-ping.
+    - SQLite files: a small pool (connections are cheap, writers serialize
+      anyway); PRAGMAs are applied on connect by apply_sqlite_pragmas.
+    """
+    if is_memory_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}}
+    options: Dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+    }
+    if is_sqlite(url):
+        # check_same_thread=False is required for SQLite interactions across threads
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_recycle"] = settings.DB_POOL_RECYCLE
+        options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    SQLite performance profile, applied to every new connection.
+    WAL lets readers run while a History insert is being written and
+    synchronous=NORMAL is safe under WAL while avoiding an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    if settings.SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)}")
+    cursor.close()
+
+def configure_engine(engine: Engine, url: str) -> None:
+    if is_sqlite(url) and not is_memory_sqlite(url):
+        event.listen(engine, "connect", apply_sqlite_pragmas)
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+configure_engine(engine, settings.DATABASE_URL)
+
+# Async engine used by request handlers so DB I/O does not block the event loop.
+# The sync engine above stays for startup tasks, migrations and worker threads.
+async_engine = create_async_engine(get_async_database_url(), **engine_options(get_async_database_url()))
+configure_engine(async_engine.sync_engine, get_async_database_url())
+
+def pool_stats(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    stats: Dict[str, Any] = {"class": type(pool).__name__, "status": pool.status()}
+    # QueuePool counters (other pool classes do not have them)
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    return stats
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # expire_on_commit=False: attributes stay readable after commit without
+    # an implicit (sync) refresh
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+def find_missing_columns() -> List[str]:
+    """
+    Columns declared on the models but missing from existing tables, i.e.
+    a database older than the code. create_all() never adds columns;
+    `alembic upgrade head` does.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                missing.append(f"{table.name}.{column.name}")
+    return missing
+
+def find_missing_indexes() -> List[str]:
+    """
+    Indexes declared on the models but missing from the database.
+    create_all() never adds indexes to tables that already exist;
+    `alembic upgrade head` does.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                missing.append(f"{table.name}.{index.name}")
+    return missing
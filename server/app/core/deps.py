@@ -3,59 +3,91 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core import security
+from app.core.auth_cache import auth_cache
 from app.core.config import settings
-from app.core.database import get_session
-from app.models.user import User
+from app.core.database import get_async_session
+from app.models.user import User, UserSnapshot
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl="/auth/login",
     auto_error=False
 )
 
-def get_current_user(
-    session: Session = Depends(get_session),
+def decode_user_id(token: str) -> Optional[int]:
+    """User id of a valid token, None if it is invalid or expired."""
+    user_id = auth_cache.get_user_id(token)
+    if user_id is not None:
+        return user_id
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+        user_id = int(payload.get("sub"))
+    except (JWTError, ValidationError, TypeError, ValueError):
+        return None
+    if "exp" in payload:
+        auth_cache.set_user_id(token, user_id, payload["exp"])
+    return user_id
+
+async def load_user_snapshot(session: AsyncSession, user_id: int) -> Optional[UserSnapshot]:
+    user = auth_cache.get_user(user_id)
+    if user is None:
+        db_user = await session.get(User, user_id)
+        if not db_user:
+            return None
+        user = UserSnapshot.model_validate(db_user)
+        auth_cache.set_user(user)
+    return user
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_async_session),
     token: str = Depends(reusable_oauth2)
-) -> User:
+) -> UserSnapshot:
     if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = payload.get("sub")
-    except (JWTError, ValidationError):
+    user_id = decode_user_id(token)
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = session.get(User, int(token_data))
+    user = await load_user_snapshot(session, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
 
-def get_current_user_optional(
-    session: Session = Depends(get_session),
+async def get_current_user_optional(
+    session: AsyncSession = Depends(get_async_session),
     token: Optional[str] = Depends(reusable_oauth2)
-) -> Optional[User]:
+) -> Optional[UserSnapshot]:
     if not token:
         return None
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
-        )
-        token_data = payload.get("sub")
-    except (JWTError, ValidationError):
+    user_id = decode_user_id(token)
+    if user_id is None:
         return None
-        
-    user = session.get(User, int(token_data))
+
+    user = await load_user_snapshot(session, user_id)
     if not user or not user.is_active:
         return None
     return user
+
+async def get_current_user_record(
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    """
+    The caller's User row, read from the database (not cached).
+    For handlers that change the user or need its password hash.
+    """
+    user = await session.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
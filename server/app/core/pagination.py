@@ -1,6 +1,14 @@
-from typing import TypeVar, Generic, List
+import base64
+import json
+from datetime import datetime
+from typing import Any, TypeVar, Generic, List, Optional, Tuple
+from fastapi import HTTPException
 from pydantic import BaseModel
 from math import ceil
+from sqlalchemy import func, tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 
 T = TypeVar('T')
 
@@ -11,6 +19,11 @@ class PaginatedResponse(BaseModel, Generic[T]):
     per_page: int
     total_pages: int
 
+class CursorPage(BaseModel, Generic[T]):
+    items: List[T]
+    per_page: int
+    next_cursor: Optional[str] = None  # None on the last page
+
 def paginate(items: List[T], page: int = 1, per_page: int = 20) -> PaginatedResponse[T]:
     """
     Paginate a list of items.
@@ -41,3 +54,108 @@ def paginate(items: List[T], page: int = 1, per_page: int = 20) -> PaginatedResp
         per_page=per_page,
         total_pages=total_pages
     )
+
+async def paginate_query(
+    session: AsyncSession, statement: SelectOfScalar[T], page: int = 1, per_page: int = 20
+) -> PaginatedResponse[T]:
+    """
+    Paginate a SQLModel select statement in the database.
+    
+    Runs a COUNT(*) over the statement and fetches only the requested page
+    with LIMIT/OFFSET, so the cost of a page does not grow with the total
+    number of rows.
+    
+    Args:
+        session: Database session
+        statement: select() statement, including filters and ordering
+        page: Current page number (1-indexed)
+        per_page: Number of items per page (max 100)
+    
+    Returns:
+        PaginatedResponse with metadata
+    """
+    # Enforce limits
+    per_page = min(per_page, 100)  # Max 100 items per page
+    page = max(page, 1)  # Minimum page 1
+    
+    # Ordering is irrelevant for the count
+    count_statement = select(func.count()).select_from(statement.order_by(None).subquery())
+    total = (await session.exec(count_statement)).one()
+    total_pages = ceil(total / per_page) if total > 0 else 1
+    
+    items = (await session.exec(statement.offset((page - 1) * per_page).limit(per_page))).all()
+    
+    return PaginatedResponse(
+        items=items,
+        total=total,
+        page=page,
+        per_page=per_page,
+        total_pages=total_pages
+    )
+
+def encode_token(values: List[Any]) -> str:
+    """Opaque, URL-safe cursor for a list of JSON values."""
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_token(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque cursor for the row (created_at, id)."""
+    return encode_token([created_at.isoformat(), id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, id = decode_token(cursor)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def paginate_keyset(
+    session: AsyncSession,
+    statement: SelectOfScalar[T],
+    created_column: Any,
+    id_column: Any,
+    cursor: Optional[str] = None,
+    per_page: int = 20,
+) -> CursorPage[T]:
+    """
+    Keyset (cursor) pagination, newest first.
+    
+    Instead of OFFSET, each page seeks past the last row of the previous
+    one with `(created_at, id) < cursor`, which an index on
+    (..., created_at, id) answers directly. Page cost stays constant
+    however deep the client scrolls.
+    
+    Args:
+        session: Database session
+        statement: select() statement with filters (ordering is replaced)
+        created_column, id_column: Columns the cursor encodes
+        cursor: next_cursor of the previous page, None for the first page
+        per_page: Number of items per page (max 100)
+    """
+    per_page = min(max(per_page, 1), 100)
+    
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        statement = statement.where(tuple_(created_column, id_column) < tuple_(created_at, id))
+    
+    # Fetch one extra row to know if there is a next page
+    statement = statement.order_by(None).order_by(created_column.desc(), id_column.desc())
+    rows = (await session.exec(statement.limit(per_page + 1))).all()
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
+    
+    return CursorPage(items=rows, per_page=per_page, next_cursor=next_cursor)
@@ -1,32 +1,56 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
 from sqlmodel import SQLModel
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
-from app.core.database import engine
+from app.core.database import async_engine, engine, find_missing_columns, find_missing_indexes, pool_stats
 from app.core.config import settings
+from app.core.hashing import password_hasher
+from app.services.gemini_client import gemini_client
+from app.services.response_cache import response_cache
+from app.services.job_queue import job_queue
+from app.services.history_service import history_recorder
+from app.services.search_service import ensure_search_index
 # Import models to ensure they are registered with SQLModel.metadata
 from app.models.user import User
 from app.models.history import History
 from app.models.password_reset import PasswordReset
 from app.models.system_config import SystemConfig
+from app.models.ai_cache import AICacheEntry
+from app.models.job import Job
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address, default_limits=["100/minute"])
+def check_schema():
+    # Queries on an older schema fail with "no such column"; stop with a clear message instead
+    missing = find_missing_columns()
+    if missing:
+        raise RuntimeError(
+            f"Database schema is out of date (missing columns: {', '.join(missing)}). "
+            "Run `alembic upgrade head` before starting the API."
+        )
+    missing = find_missing_indexes()
+    if missing:
+        print(f"WARNING: missing database indexes: {', '.join(missing)}. Run `alembic upgrade head`.")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    check_schema()
+    ensure_search_index()
+    await response_cache.prune()
+    if settings.HISTORY_WRITE_BEHIND:
+        await history_recorder.start()
+    await job_queue.start()
     yield
+    await job_queue.stop()
+    await history_recorder.stop()  # Flush pending history rows
+    await gemini_client.aclose()
+    password_hasher.shutdown()
+    await async_engine.dispose()
 
 app = FastAPI(title="3ssila-AI API", lifespan=lifespan)
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
 # CORS Configuration
 origins = ["*"] if settings.ALLOWED_ORIGINS == "*" else settings.ALLOWED_ORIGINS.split(",")
@@ -43,3 +67,24 @@ app.include_router(auth.router)
 app.include_router(tools.router)
 app.include_router(history.router)
 app.include_router(admin.router)
+
+@app.get("/health", tags=["health"])
+async def health() -> dict:
+    """
+    Liveness check with database connectivity and connection pool stats.
+    """
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        database = "ok"
+    except Exception as e:
+        print(f"Health check DB error: {e}")
+        database = "error"
+    return {
+        "status": "ok" if database == "ok" else "degraded",
+        "database": database,
+        "pools": {
+            "sync": pool_stats(engine),
+            "async": pool_stats(async_engine.sync_engine),
+        },
+    }
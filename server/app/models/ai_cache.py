@@ -0,0 +1,8 @@
+from datetime import datetime
+from sqlmodel import Field, SQLModel
+
+class AICacheEntry(SQLModel, table=True):
+    key: str = Field(primary_key=True)  # sha256 of operation, text, language and prompt version
+    value: str
+    expires_at: datetime = Field(index=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
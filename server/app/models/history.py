@@ -1,13 +1,44 @@
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
+from app.core.compression import CompressedText
+from app.core.config import settings
+
+def history_preview(context) -> Optional[str]:
+    """Column default for History.preview: the start of original_text."""
+    original_text = context.get_current_parameters().get("original_text")
+    return original_text[:settings.HISTORY_PREVIEW_CHARS] if original_text else None
 
 class History(SQLModel, table=True):
+    __table_args__ = (
+        # Listing newest first per user; also serves keyset pagination
+        Index("ix_history_user_created", "user_id", "created_at", "id"),
+        # Same, filtered by action_type (summaries / translations)
+        Index("ix_history_user_action_created", "user_id", "action_type", "created_at", "id"),
+    )
+
+    # Small columns first: light list views read them without touching the texts
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     action_type: str = Field(default="unknown") # summarize, translate
-    original_text: str
-    summary_text: Optional[str] = None
-    translated_text: Optional[str] = None
     target_lang: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    preview: Optional[str] = Field(default=None, sa_column_kwargs={"default": history_preview})
+    # Stored compressed (see app/core/compression.py)
+    original_text: str = Field(sa_type=CompressedText)
+    summary_text: Optional[str] = Field(default=None, sa_type=CompressedText)
+    translated_text: Optional[str] = Field(default=None, sa_type=CompressedText)
+
+class HistoryListItem(SQLModel):
+    """Light view of a History row: no texts, only the preview."""
+    id: int
+    action_type: str
+    target_lang: Optional[str] = None
+    created_at: datetime
+    preview: Optional[str] = None
+
+class HistorySearchHit(SQLModel):
+    item: History
+    score: float  # Relevance, higher is better
+    snippet: Optional[str] = None  # Matching excerpt of the original text, matches in [brackets]
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+from uuid import uuid4
+from sqlmodel import Field, SQLModel
+
+class Job(SQLModel, table=True):
+    id: str = Field(default_factory=lambda: uuid4().hex, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)  # None for guests
+    action_type: str  # summarize, translate
+    status: str = Field(default="pending", index=True)  # pending, running, done, failed
+    payload: str  # JSON encoded request (text, target_lang)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class JobRead(SQLModel):
+    id: str
+    action_type: str
+    status: str
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -1,8 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 class PasswordReset(SQLModel, table=True):
+    __table_args__ = (
+        # Reset code verification: email + code, still valid
+        Index("ix_passwordreset_email_code_expires", "email", "code", "expires_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     email: str = Field(index=True)
     code: str  # The 6-digit code
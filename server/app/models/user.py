@@ -13,3 +13,8 @@ class User(UserBase, table=True):
 class UserRead(UserBase):
     id: int
 
+
+class UserSnapshot(UserBase):
+    """What request handlers need to know about the caller (cached, read-only)."""
+    id: int
+    tier: str = "user"  # guest requests have no snapshot
@@ -3,11 +3,22 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from pydantic import BaseModel
 
+from app.core.auth_cache import auth_cache
+from app.core.config_cache import system_config_cache
+from app.core.hashing import password_hasher
 from app.core.database import get_session
 from app.core.security_encryption import encryption_service
 from app.models.system_config import SystemConfig
-from app.models.user import User
+from app.models.user import UserSnapshot
 from app.core.deps import get_current_user
+from app.services.adaptive_concurrency import gemini_concurrency
+from app.services.ai_service import prompt_flight, result_flight
+from app.services.circuit_breaker import gemini_breaker
+from app.services.history_service import history_recorder
+from app.services.job_queue import job_queue
+from app.services.quota import quota_manager
+from app.services.rate_limiter import gemini_scheduler
+from app.services.response_cache import response_cache
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -20,7 +31,7 @@ def update_config(
     key: str,
     config_in: ConfigUpdate,
     session: Session = Depends(get_session),
-    current_user: User = Depends(get_current_user), # Require authentication
+    current_user: UserSnapshot = Depends(get_current_user), # Require authentication
 ) -> Any:
     """
     Update system configuration.
@@ -46,6 +57,32 @@ def update_config(
     session.add(config)
     session.commit()
     session.refresh(config)
+    # Drop the cached value here; other workers see the new updated_at version
+    system_config_cache.invalidate(key)
     return config
 
+@router.get("/metrics")
+def get_metrics(
+    current_user: UserSnapshot = Depends(get_current_user), # Require authentication
+) -> Any:
+    """
+    Runtime counters for the AI pipeline of this worker.
+    """
+    return {
+        "cache": response_cache.stats(),
+        "rate_scheduler": gemini_scheduler.stats(),
+        "circuit_breaker": gemini_breaker.stats(),
+        "concurrency": gemini_concurrency.stats(),
+        "jobs": job_queue.stats(),
+        "history_recorder": history_recorder.stats(),
+        "system_config": system_config_cache.stats(),
+        "auth": auth_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "quota": quota_manager.stats(),
+        "single_flight": {
+            "results": result_flight.stats(),
+            "prompts": prompt_flight.stats(),
+        },
+    }
+
 from datetime import datetime
@@ -1,11 +1,13 @@
 from typing import Any, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core import security
 from app.core.config import settings
-from app.core.database import get_session, engine
-from app.models.user import User, UserRead
+from app.core.database import get_async_session
+from app.core.hashing import password_hasher
+from app.models.user import User, UserRead, UserSnapshot
 from app.models.password_reset import PasswordReset
 import random
 from datetime import datetime
@@ -14,16 +16,16 @@ from datetime import datetime
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/signup", response_model=UserRead)
-def create_user(
+async def create_user(
     user_in: User,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Create new user without the need to be logged in.
     """
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.email == user_in.email)
-    ).first()
+    )).first()
     if user:
         raise HTTPException(
             status_code=400,
@@ -31,31 +33,42 @@ def create_user(
         )
     
     # Hash the password
-    user_in.hashed_password = security.get_password_hash(user_in.hashed_password)
+    user_in.hashed_password = await password_hasher.hash(user_in.hashed_password)
     
     session.add(user_in)
-    session.commit()
-    session.refresh(user_in)
+    await session.commit()
+    await session.refresh(user_in)
     return user_in
 
 @router.post("/login")
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests.
     """
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.email == form_data.username)
-    ).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    )).first()
+    if not user:
+        raise HTTPException(
+            status_code=400, detail="Incorrect email or password"
+        )
+    valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=400, detail="Incorrect email or password"
         )
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     
+    # Hashing parameters changed since this hash was made: store a fresh one
+    if new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+    
     access_token_expires = security.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
         user.id, expires_delta=access_token_expires
@@ -65,7 +78,8 @@ def login(
         "token_type": "bearer",
     }
 
-from app.core.deps import get_current_user
+from app.core.auth_cache import auth_cache
+from app.core.deps import get_current_user, get_current_user_record
 from pydantic import BaseModel, EmailStr
 
 class PasswordResetRequest(BaseModel):
@@ -88,8 +102,8 @@ class UpdateProfileRequest(BaseModel):
     email: Optional[EmailStr] = None
 
 @router.get("/me", response_model=UserRead)
-def read_users_me(
-    current_user: User = Depends(get_current_user)
+async def read_users_me(
+    current_user: UserSnapshot = Depends(get_current_user)
 ) -> Any:
     """
     Get current user.
@@ -97,17 +111,17 @@ def read_users_me(
     return current_user
 
 @router.post("/send-reset-code")
-def send_reset_code(
+async def send_reset_code(
     request: PasswordResetRequest,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Generate and send a 6-digit password reset code.
     MOCK: Currently prints code to console instead of sending email.
     """
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.email == request.email)
-    ).first()
+    )).first()
     
     if not user:
         # Security: Don't reveal if user exists
@@ -124,7 +138,7 @@ def send_reset_code(
         expires_at=expires_at
     )
     session.add(reset_entry)
-    session.commit()
+    await session.commit()
     
     # MOCK EMAIL SENDING
     print(f"============================================")
@@ -140,21 +154,21 @@ def send_reset_code(
 
 
 @router.post("/reset-password-with-code")
-def reset_password_with_code(
+async def reset_password_with_code(
     request: PasswordResetConfirm,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Reset password using the 6-digit verification code.
     """
     # 1. Verify code
-    reset_entry = session.exec(
+    reset_entry = (await session.exec(
         select(PasswordReset)
         .where(PasswordReset.email == request.email)
         .where(PasswordReset.code == request.code)
         .where(PasswordReset.expires_at > datetime.utcnow())
         .order_by(PasswordReset.created_at.desc())
-    ).first()
+    )).first()
     
     if not reset_entry:
         raise HTTPException(
@@ -163,63 +177,65 @@ def reset_password_with_code(
         )
     
     # 2. Get User
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.email == request.email)
-    ).first()
+    )).first()
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
     # 3. Update Password
-    user.hashed_password = security.get_password_hash(request.new_password)
+    user.hashed_password = await password_hasher.hash(request.new_password)
     session.add(user)
     
     # 4. Optional: Delete used code (or all codes for this user)
-    session.delete(reset_entry)
+    await session.delete(reset_entry)
     
-    session.commit()
+    await session.commit()
+    auth_cache.invalidate_user(user.id)
     
     return {"message": "Password updated successfully"}
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     request: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: User = Depends(get_current_user_record),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Change password for logged-in user.
     Requires old password verification.
     """
     # Verify old password
-    if not security.verify_password(request.old_password, current_user.hashed_password):
+    if not await password_hasher.verify(request.old_password, current_user.hashed_password):
         raise HTTPException(
             status_code=400,
             detail="Incorrect old password"
         )
     
     # Update to new password
-    current_user.hashed_password = security.get_password_hash(request.new_password)
+    current_user.hashed_password = await password_hasher.hash(request.new_password)
     session.add(current_user)
-    session.commit()
+    await session.commit()
+    auth_cache.invalidate_user(current_user.id)
     
     return {"message": "Password updated successfully"}
 
 @router.put("/profile", response_model=UserRead)
-def update_profile(
+async def update_profile(
     request: UpdateProfileRequest,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: User = Depends(get_current_user_record),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Update current user profile.
     """
     if request.email:
         # Check if email already exists
-        existing_user = session.exec(
+        existing_user = (await session.exec(
             select(User).where(User.email == request.email)
-        ).first()
+        )).first()
         if existing_user and existing_user.id != current_user.id:
             raise HTTPException(
                 status_code=400,
@@ -228,6 +244,7 @@ def update_profile(
         current_user.email = request.email
     
     session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
+    await session.commit()
+    auth_cache.invalidate_user(current_user.id)
+    await session.refresh(current_user)
     return current_user
@@ -1,34 +1,88 @@
+from datetime import datetime
 from fastapi import APIRouter, Depends, Query, HTTPException
-from typing import List, Any
-from sqlmodel import Session, select
+from fastapi.responses import StreamingResponse
+from typing import Annotated, List, Any, Literal, Optional, Union
+from pydantic import Field
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel.sql.expression import SelectOfScalar
 from app.core.deps import get_current_user
-from app.core.database import get_session
-from app.core.pagination import paginate, PaginatedResponse
-from app.models.user import User
-from app.models.history import History
+from app.core.database import get_async_session
+from app.core.pagination import paginate_keyset, paginate_query, CursorPage, PaginatedResponse
+from app.models.user import UserSnapshot
+from app.models.history import History, HistoryListItem, HistorySearchHit
+from app.services.history_service import EXPORT_FORMATS, bulk_delete_history, export_history
+from app.services.search_service import search_history
 
 router = APIRouter(prefix="/history", tags=["history"])
 
-@router.get("/", response_model=PaginatedResponse[History])
+# Tried in order, so full rows are never narrowed to the light view
+HistoryPage = Annotated[
+    Union[
+        PaginatedResponse[History],
+        CursorPage[History],
+        PaginatedResponse[HistoryListItem],
+        CursorPage[HistoryListItem],
+    ],
+    Field(union_mode="left_to_right"),
+]
+
+# Columns of the light view: never reads (or decompresses) the texts
+LIGHT_COLUMNS = (History.id, History.action_type, History.target_lang, History.created_at, History.preview)
+
+async def list_history(
+    session: AsyncSession,
+    statement: SelectOfScalar[History],
+    page: int,
+    per_page: int,
+    mode: str,
+    cursor: Optional[str],
+    view: str = "full",
+) -> HistoryPage:
+    """
+    mode=page: numbered pages with totals (PaginatedResponse).
+    mode=cursor: keyset pages for infinite scroll (CursorPage); pass the
+    returned next_cursor to get the following page.
+    view=light: HistoryListItem rows (preview instead of the full texts).
+    """
+    if view == "light":
+        statement = select(*LIGHT_COLUMNS).where(statement.whereclause)
+    if mode == "cursor":
+        result = await paginate_keyset(
+            session, statement, History.created_at, History.id, cursor=cursor, per_page=per_page
+        )
+    else:
+        statement = statement.order_by(History.created_at.desc(), History.id.desc())
+        result = await paginate_query(session, statement, page=page, per_page=per_page)
+    if view == "light":
+        result.items = [HistoryListItem.model_validate(row._mapping) for row in result.items]
+    return result
+
+@router.get("/", response_model=HistoryPage)
 async def get_history(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    mode: Literal["page", "cursor"] = Query("page", description="Pagination mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (mode=cursor)"),
+    view: Literal["full", "light"] = Query("full", description="light: preview only, without the full texts")
 ) -> Any:
     """
     Get all past queries for the logged-in user (paginated).
     """
-    statement = select(History).where(History.user_id == current_user.id).order_by(History.created_at.desc())
-    results = session.exec(statement).all()
-    return paginate(results, page=page, per_page=per_page)
+    statement = select(History).where(History.user_id == current_user.id)
+    return await list_history(session, statement, page, per_page, mode, cursor, view)
 
-@router.get("/summaries", response_model=PaginatedResponse[History])
+@router.get("/summaries", response_model=HistoryPage)
 async def get_summaries(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    mode: Literal["page", "cursor"] = Query("page", description="Pagination mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (mode=cursor)"),
+    view: Literal["full", "light"] = Query("full", description="light: preview only, without the full texts")
 ) -> Any:
     """
     Get all summaries for the logged-in user (paginated).
@@ -36,16 +90,18 @@ async def get_summaries(
     statement = select(History).where(
         History.user_id == current_user.id,
         History.action_type == "summarize"
-    ).order_by(History.created_at.desc())
-    results = session.exec(statement).all()
-    return paginate(results, page=page, per_page=per_page)
+    )
+    return await list_history(session, statement, page, per_page, mode, cursor, view)
 
-@router.get("/translations", response_model=PaginatedResponse[History])
+@router.get("/translations", response_model=HistoryPage)
 async def get_translations(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
     page: int = Query(1, ge=1, description="Page number"),
-    per_page: int = Query(20, ge=1, le=100, description="Items per page")
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    mode: Literal["page", "cursor"] = Query("page", description="Pagination mode"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (mode=cursor)"),
+    view: Literal["full", "light"] = Query("full", description="light: preview only, without the full texts")
 ) -> Any:
     """
     Get all translations for the logged-in user (paginated).
@@ -53,61 +109,88 @@ async def get_translations(
     statement = select(History).where(
         History.user_id == current_user.id,
         History.action_type == "translate"
-    ).order_by(History.created_at.desc())
-    results = session.exec(statement).all()
-    return paginate(results, page=page, per_page=per_page)
+    )
+    return await list_history(session, statement, page, per_page, mode, cursor, view)
+
+@router.get("/search", response_model=CursorPage[HistorySearchHit])
+async def search(
+    q: str = Query(..., min_length=1, max_length=500, description="Words to search for; end a word with * for a prefix search"),
+    action_type: Optional[Literal["summarize", "translate"]] = Query(None, description="Only summaries or translations"),
+    target_lang: Optional[str] = Query(None, description="Only translations to this language"),
+    date_from: Optional[datetime] = Query(None, description="Created at or after this date"),
+    date_to: Optional[datetime] = Query(None, description="Created before this date"),
+    per_page: int = Query(20, ge=1, le=100, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+) -> Any:
+    """
+    Full-text search over the logged-in user's history, best matches first
+    (cursor paginated). Every word must match, in the original text or in
+    the summary/translation.
+    """
+    return await search_history(
+        session,
+        current_user.id,
+        q,
+        action_type=action_type,
+        target_lang=target_lang,
+        date_from=date_from,
+        date_to=date_to,
+        cursor=cursor,
+        per_page=per_page,
+    )
+
+@router.get("/export")
+async def export(
+    format: Literal["ndjson", "csv", "jsonl.gz", "csv.gz"] = Query("ndjson", description="Export format; .gz variants are gzipped"),
+    action_type: Optional[Literal["summarize", "translate"]] = Query(None, description="Only summaries or translations"),
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> Any:
+    """
+    Download the logged-in user's whole history, streamed row by row.
+    """
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"history-{datetime.utcnow():%Y%m%d}.{extension}"
+    return StreamingResponse(
+        export_history(current_user.id, format, action_type),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 @router.delete("/summaries/all")
 async def delete_all_summaries(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Delete ALL summaries for the logged-in user.
     """
-    statement = select(History).where(
-        History.user_id == current_user.id,
-        History.action_type == "summarize"
-    )
-    results = session.exec(statement).all()
-    
-    for item in results:
-        session.delete(item)
-        
-    session.commit()
-    return {"message": "All summaries deleted successfully"}
+    deleted = await bulk_delete_history(session, current_user.id, "summarize")
+    return {"message": "All summaries deleted successfully", "deleted": deleted}
 
 @router.delete("/translations/all")
 async def delete_all_translations(
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Delete ALL translations for the logged-in user.
     """
-    statement = select(History).where(
-        History.user_id == current_user.id,
-        History.action_type == "translate"
-    )
-    results = session.exec(statement).all()
-    
-    for item in results:
-        session.delete(item)
-        
-    session.commit()
-    return {"message": "All translations deleted successfully"}
+    deleted = await bulk_delete_history(session, current_user.id, "translate")
+    return {"message": "All translations deleted successfully", "deleted": deleted}
 
 @router.delete("/summaries/{summary_id}")
 async def delete_summary(
     summary_id: int,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Delete a specific summary by ID.
     User can only delete their own summaries.
     """
-    history_item = session.get(History, summary_id)
+    history_item = await session.get(History, summary_id)
     
     if not history_item:
         raise HTTPException(status_code=404, detail="Summary not found")
@@ -120,22 +203,22 @@ async def delete_summary(
     if history_item.action_type != "summarize":
         raise HTTPException(status_code=400, detail="This item is not a summary")
     
-    session.delete(history_item)
-    session.commit()
+    await session.delete(history_item)
+    await session.commit()
     
     return {"message": "Summary deleted successfully"}
 
 @router.delete("/translations/{translation_id}")
 async def delete_translation(
     translation_id: int,
-    current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    current_user: UserSnapshot = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
 ) -> Any:
     """
     Delete a specific translation by ID.
     User can only delete their own translations.
     """
-    history_item = session.get(History, translation_id)
+    history_item = await session.get(History, translation_id)
     
     if not history_item:
         raise HTTPException(status_code=404, detail="Translation not found")
@@ -148,7 +231,7 @@ async def delete_translation(
     if history_item.action_type != "translate":
         raise HTTPException(status_code=400, detail="This item is not a translation")
     
-    session.delete(history_item)
-    session.commit()
+    await session.delete(history_item)
+    await session.commit()
     
     return {"message": "Translation deleted successfully"}
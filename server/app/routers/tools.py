@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, field_validator
-from typing import Any, Optional
-from sqlmodel import Session
-from slowapi import Limiter
-from slowapi.util import get_remote_address
+from typing import Any, AsyncIterator, List, Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
 from app.core.deps import get_current_user_optional
-from app.core.database import get_session
-from app.models.user import User
+from app.core.database import get_async_session, async_engine
+from app.models.user import UserSnapshot
 from app.models.history import History
-from app.services.ai_service import summarize_text, translate_text
+from app.models.job import Job, JobRead
+from app.services.ai_service import (
+    ChunkError,
+    stream_summarize,
+    stream_translate,
+    summarize_text,
+    translate_text,
+)
+from app.services.batch_service import batch_summarize, batch_translate
+from app.services.circuit_breaker import gemini_breaker
+from app.services.gemini_client import GeminiError, GeminiUnavailable
+from app.services.history_service import history_recorder
+from app.services.job_queue import FINISHED_STATUSES, job_queue
+from app.services.quota import TIERS, QuotaCharge, QuotaExceeded, quota_manager
+from app.services.rate_limiter import ai_queue, estimate_tokens
 
 router = APIRouter(prefix="/tools", tags=["tools"])
-limiter = Limiter(key_func=get_remote_address)
 
 # Input validation helper
 def validate_text_input(text: str, max_length: int = 4000) -> str:
@@ -22,6 +36,100 @@ def validate_text_input(text: str, max_length: int = 4000) -> str:
     # Basic sanitization: remove null bytes
     return text.replace("\x00", "")
 
+def check_tier_limit(text: str, current_user: Optional[UserSnapshot]) -> None:
+    # Guest: Max 250 chars, User: Max 4000 chars (GUEST_MAX_CHARS / USER_MAX_CHARS)
+    limit = TIERS[current_user.tier if current_user else "guest"].max_chars
+    if len(text) > limit:
+        raise HTTPException(
+            status_code=403, 
+            detail=f"Character limit exceeded ({limit}). {'Login to increase limit.' if not current_user else ''}"
+        )
+
+def unavailable_detail(retry_after: Optional[float]) -> dict:
+    return {
+        "code": "ai_unavailable",
+        "message": "The AI service is temporarily unavailable. Please retry later.",
+        "retry_after": int((retry_after or 1) + 0.999),
+    }
+
+def ai_unavailable(retry_after: Optional[float]) -> HTTPException:
+    detail = unavailable_detail(retry_after)
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(detail["retry_after"])})
+
+def check_ai_available() -> None:
+    """Fail fast while the Gemini circuit breaker refuses calls."""
+    retry_after = gemini_breaker.check()
+    if retry_after:
+        raise ai_unavailable(retry_after)
+
+async def check_quota(request: Request, current_user: Optional[UserSnapshot], texts: List[str]) -> QuotaCharge:
+    """
+    AI availability, the per-text tier limit, then the caller's shared
+    quotas (requests per minute, daily characters and tokens), counted once
+    per API request. Nothing is counted while the AI service is unavailable;
+    a request that gets a 503 later on (queue rejection, breaker opening,
+    no concurrency slot) is refunded with refund_unavailable(). Async jobs
+    are counted when queued.
+    """
+    check_ai_available()
+    for text in texts:
+        check_tier_limit(text, current_user)
+    if current_user:
+        subject, tier = f"user:{current_user.id}", current_user.tier
+    else:
+        subject, tier = f"ip:{request.client.host if request.client else 'unknown'}", "guest"
+    try:
+        charge = await quota_manager.consume(
+            subject,
+            tier,
+            chars=sum(len(text) for text in texts),
+            tokens=sum(2 * estimate_tokens(text) for text in texts),  # Input + output estimate
+        )
+    except QuotaExceeded as e:
+        raise HTTPException(
+            status_code=429,
+            detail=e.message,
+            headers={"Retry-After": str(int(e.retry_after + 0.999))},
+        )
+    # Gemini calls made for this request wait in the caller's queue
+    ai_queue.set("user" if current_user else "guest")
+    return charge
+
+async def refund_unavailable(charge: QuotaCharge, error: GeminiUnavailable) -> HTTPException:
+    """Refund a request the AI service could not serve and build its 503."""
+    await quota_manager.refund(charge)
+    return ai_unavailable(error.retry_after)
+
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # Stop proxies (nginx) from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def enqueue_job(
+    session: AsyncSession, action_type: str, payload: dict, current_user: Optional[UserSnapshot]
+) -> JSONResponse:
+    job = Job(
+        user_id=current_user.id if current_user else None,
+        action_type=action_type,
+        payload=json.dumps(payload),
+    )
+    session.add(job)
+    await session.commit()
+    job_queue.submit(job.id)
+    return JSONResponse(status_code=202, content={
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/tools/jobs/{job.id}",
+        "events_url": f"/tools/jobs/{job.id}/events",
+    })
+
 class TextRequest(BaseModel):
     text: str
 
@@ -29,87 +137,308 @@ class TranslationRequest(BaseModel):
     text: str
     target_lang: str = "French"
 
+class BatchTextRequest(BaseModel):
+    texts: List[str]
+
+class BatchTranslationRequest(BaseModel):
+    texts: List[str]
+    target_lang: str = "French"
+
+async def check_batch(request: Request, texts: List[str], current_user: Optional[UserSnapshot]) -> QuotaCharge:
+    if not texts:
+        raise HTTPException(status_code=400, detail="texts cannot be empty")
+    if len(texts) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items ({len(texts)}). Maximum is {settings.BATCH_MAX_ITEMS}."
+        )
+    charge = await check_quota(request, current_user, texts)
+    ai_queue.set("background")  # Batches yield to interactive requests
+    return charge
+
 @router.post("/summarize")
-@limiter.limit("10/minute")  # Guest limit
 async def summarize_endpoint(
     request: Request,
     data: TextRequest,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    session: Session = Depends(get_session)
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+    session: AsyncSession = Depends(get_async_session),
+    run_async: bool = Query(False, alias="async", description="Queue as a background job")
 ) -> Any:
     """
     Summarize text.
     - Guest: Max 250 chars, no history.
     - User: Max 4000 chars, saves history.
+    - `?async=true`: returns a job id right away, poll /tools/jobs/{id}.
     """
     # 1. Tier System Logic
-    if current_user:
-        limit = 4000
-    else:
-        limit = 250
-    
-    if len(data.text) > limit:
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Character limit exceeded ({limit}). {'Login to increase limit.' if not current_user else ''}"
-        )
+    charge = await check_quota(request, current_user, [data.text])
+
+    if run_async:
+        return await enqueue_job(session, "summarize", {"text": data.text}, current_user)
 
     # 2. Call AI Service
-    summary = summarize_text(data.text)
+    try:
+        summary = await summarize_text(data.text)
+    except GeminiUnavailable as e:
+        raise await refund_unavailable(charge, e)
 
     # 3. Save History (Users only)
     if current_user:
-        history_entry = History(
+        await history_recorder.record(History(
             user_id=current_user.id,
             original_text=data.text,
             summary_text=summary,
             translated_text="", # Not performing translation here
             action_type="summarize"
-        )
-        session.add(history_entry)
-        session.commit()
+        ))
 
     return {"summary": summary}
 
 @router.post("/translate")
-@limiter.limit("10/minute")  # Guest limit
 async def translate_endpoint(
     request: Request,
     data: TranslationRequest,
-    current_user: Optional[User] = Depends(get_current_user_optional),
-    session: Session = Depends(get_session)
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+    session: AsyncSession = Depends(get_async_session),
+    run_async: bool = Query(False, alias="async", description="Queue as a background job")
 ) -> Any:
     """
     Translate text.
     - Guest: Max 250 chars, no history.
     - User: Max 4000 chars, saves history.
+    - `?async=true`: returns a job id right away, poll /tools/jobs/{id}.
     """
     # 1. Tier System Logic
-    if current_user:
-        limit = 4000
-    else:
-        limit = 250
-    
-    if len(data.text) > limit:
-        raise HTTPException(
-            status_code=403, 
-            detail=f"Character limit exceeded ({limit}). {'Login to increase limit.' if not current_user else ''}"
+    charge = await check_quota(request, current_user, [data.text])
+
+    if run_async:
+        return await enqueue_job(
+            session, "translate", {"text": data.text, "target_lang": data.target_lang}, current_user
         )
 
     # 2. Call AI Service
-    translation = translate_text(data.text, data.target_lang)
+    try:
+        translation = await translate_text(data.text, data.target_lang)
+    except GeminiUnavailable as e:
+        raise await refund_unavailable(charge, e)
 
     # 3. Save History (Users only)
     if current_user:
-        history_entry = History(
+        await history_recorder.record(History(
             user_id=current_user.id,
             original_text=data.text,
             summary_text="", # Not performing summary here
             translated_text=translation,
             target_lang=data.target_lang,
             action_type="translate"
-        )
-        session.add(history_entry)
-        session.commit()
+        ))
 
     return {"translation": translation}
+
+@router.post("/summarize/stream")
+async def summarize_stream_endpoint(
+    request: Request,
+    data: TextRequest,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+) -> Any:
+    """
+    Summarize text, streamed as Server-Sent Events.
+    - `data: {"text": ...}` for every piece of the summary
+    - `event: done` with the full summary, or `event: error`
+    History is saved once the stream completes (users only).
+    """
+    charge = await check_quota(request, current_user, [data.text])
+
+    async def events() -> AsyncIterator[str]:
+        pieces = []
+        try:
+            async for piece in stream_summarize(data.text):
+                pieces.append(piece)
+                yield sse_event({"text": piece})
+        except GeminiUnavailable as e:
+            await quota_manager.refund(charge)
+            yield sse_event({"detail": unavailable_detail(e.retry_after)}, event="error")
+            return
+        except (GeminiError, ChunkError) as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+
+        summary = "".join(pieces)
+        if current_user:
+            await history_recorder.record(History(
+                user_id=current_user.id,
+                original_text=data.text,
+                summary_text=summary,
+                translated_text="",
+                action_type="summarize"
+            ))
+        yield sse_event({"summary": summary}, event="done")
+
+    return sse_response(events())
+
+@router.post("/translate/stream")
+async def translate_stream_endpoint(
+    request: Request,
+    data: TranslationRequest,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+) -> Any:
+    """
+    Translate text, streamed as Server-Sent Events.
+    - `data: {"text": ...}` for every piece of the translation
+    - `event: done` with the full translation, or `event: error`
+    History is saved once the stream completes (users only).
+    """
+    charge = await check_quota(request, current_user, [data.text])
+
+    async def events() -> AsyncIterator[str]:
+        pieces = []
+        try:
+            async for piece in stream_translate(data.text, data.target_lang):
+                pieces.append(piece)
+                yield sse_event({"text": piece})
+        except GeminiUnavailable as e:
+            await quota_manager.refund(charge)
+            yield sse_event({"detail": unavailable_detail(e.retry_after)}, event="error")
+            return
+        except GeminiError as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+
+        translation = "".join(pieces)
+        if current_user:
+            await history_recorder.record(History(
+                user_id=current_user.id,
+                original_text=data.text,
+                summary_text="",
+                translated_text=translation,
+                target_lang=data.target_lang,
+                action_type="translate"
+            ))
+        yield sse_event({"translation": translation}, event="done")
+
+    return sse_response(events())
+
+@router.post("/batch-summarize")
+async def batch_summarize_endpoint(
+    request: Request,
+    data: BatchTextRequest,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+) -> Any:
+    """
+    Summarize many short texts with as few model calls as possible.
+    Each item gets either a `summary` or an `error`.
+    The tier character limit applies to every item.
+    """
+    charge = await check_batch(request, data.texts, current_user)
+
+    try:
+        results = await batch_summarize(data.texts)
+    except GeminiUnavailable as e:
+        raise await refund_unavailable(charge, e)
+
+    # Save History (Users only, successful items)
+    if current_user:
+        await history_recorder.record(*[
+            History(
+                user_id=current_user.id,
+                original_text=text,
+                summary_text=summary,
+                translated_text="",
+                action_type="summarize"
+            )
+            for text, (summary, error) in zip(data.texts, results) if summary is not None
+        ])
+
+    return {
+        "results": [
+            {"index": i, "summary": summary, "error": error}
+            for i, (summary, error) in enumerate(results)
+        ]
+    }
+
+@router.post("/batch-translate")
+async def batch_translate_endpoint(
+    request: Request,
+    data: BatchTranslationRequest,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+) -> Any:
+    """
+    Translate many short texts with as few model calls as possible.
+    Each item gets either a `translation` or an `error`.
+    The tier character limit applies to every item.
+    """
+    charge = await check_batch(request, data.texts, current_user)
+
+    try:
+        results = await batch_translate(data.texts, data.target_lang)
+    except GeminiUnavailable as e:
+        raise await refund_unavailable(charge, e)
+
+    # Save History (Users only, successful items)
+    if current_user:
+        await history_recorder.record(*[
+            History(
+                user_id=current_user.id,
+                original_text=text,
+                summary_text="",
+                translated_text=translation,
+                target_lang=data.target_lang,
+                action_type="translate"
+            )
+            for text, (translation, error) in zip(data.texts, results) if translation is not None
+        ])
+
+    return {
+        "results": [
+            {"index": i, "translation": translation, "error": error}
+            for i, (translation, error) in enumerate(results)
+        ]
+    }
+
+async def get_job_for_user(session: AsyncSession, job_id: str, current_user: Optional[UserSnapshot]) -> Job:
+    job = await session.get(Job, job_id)
+    # Jobs of logged-in users are private; guest jobs are reachable by id only
+    if not job or (job.user_id and (not current_user or current_user.id != job.user_id)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=JobRead)
+async def get_job(
+    job_id: str,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+    session: AsyncSession = Depends(get_async_session)
+) -> Any:
+    """
+    Get the status (and result once finished) of a background job.
+    """
+    return await get_job_for_user(session, job_id, current_user)
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    current_user: Optional[UserSnapshot] = Depends(get_current_user_optional),
+    session: AsyncSession = Depends(get_async_session)
+) -> Any:
+    """
+    Server-Sent Events stream that emits one `done` or `failed` event
+    when the job finishes.
+    """
+    await get_job_for_user(session, job_id, current_user)
+
+    async def load_job() -> Optional[Job]:
+        async with AsyncSession(async_engine) as s:
+            return await s.get(Job, job_id)
+
+    async def events() -> AsyncIterator[str]:
+        while True:
+            job = await load_job()
+            if job is None:
+                yield sse_event({"detail": "Job not found"}, event="error")
+                return
+            if job.status in FINISHED_STATUSES:
+                yield sse_event(JobRead.model_validate(job).model_dump(mode="json"), event=job.status)
+                return
+            yield ": keep-alive\n\n"
+            await job_queue.wait(job_id, timeout=settings.JOB_POLL_INTERVAL)
+
+    return sse_response(events())
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional
+from app.core.config import settings
+
+
+class AdaptiveConcurrency:
+    """
+    Limit on upstream calls in flight, adjusted AIMD style from what the
+    calls observe:
+
+    - a success faster than `latency_target` raises the limit by 1 / limit
+      (about +1 once a full limit's worth of calls succeeded)
+    - a 429, an upstream error or a slow call multiplies it by `backoff`,
+      once per round: calls started before the last decrease do not
+      decrease it again
+
+    The limit stays between `minimum` and `maximum`. Callers over the limit
+    wait (FIFO) for a slot.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int, latency_target: float, backoff: float):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.increases = 0
+        self.decreases = 0
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        """Wait for a slot; raises asyncio.TimeoutError after `timeout` seconds."""
+        if not self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Granted just as the caller gave up
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    def release(self, outcome: Optional[str], started: float, latency: float) -> None:
+        """
+        Free a slot. `outcome` is "ok", "error", "throttled" (429) or None
+        when the call says nothing about the upstream (cancelled, bad request).
+        """
+        self.in_flight -= 1
+        if outcome == "ok" and latency <= self.latency_target:
+            if self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                self.increases += 1
+        elif outcome is not None and started >= self._last_decrease:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+            self._last_decrease = time.monotonic()
+            self.decreases += 1
+        self._wake()
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": sum(1 for f in self._waiters if not f.done()),
+            "increases": self.increases,
+            "decreases": self.decreases,
+        }
+
+
+gemini_concurrency = AdaptiveConcurrency(
+    initial=settings.GEMINI_CONCURRENCY_INITIAL,
+    minimum=settings.GEMINI_CONCURRENCY_MIN,
+    maximum=settings.GEMINI_CONCURRENCY_MAX,
+    latency_target=settings.GEMINI_SLOW_CALL_SECONDS,
+    backoff=settings.GEMINI_CONCURRENCY_BACKOFF,
+)
@@ -1,15 +1,22 @@
-import time
-import requests
-from typing import List
-from sqlmodel import Session, select
+import asyncio
+import hashlib
+from typing import AsyncIterator, List, Optional
 from app.core.config import settings
-from app.core.database import engine
-from app.models.system_config import SystemConfig
-from app.core.security_encryption import encryption_service
+from app.core.config_cache import system_config_cache
+from app.services.gemini_client import GEMINI_MODEL, GeminiError, GeminiUnavailable, gemini_client
+from app.services.rate_limiter import ai_queue
+from app.services.response_cache import make_cache_key, response_cache
+from app.services.singleflight import SingleFlight
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent"
 MAX_CHUNK_SIZE = 20000
-RPM_SLEEP = 4  # Seconds to sleep between requests to respect 15 RPM limit
+PROMPT_VERSION = "1"  # Bump when prompts change so cached results are not reused
+CACHE_VERSION = f"{GEMINI_MODEL}:{PROMPT_VERSION}"
+
+# Identical concurrent work shares one upstream call. The shared task runs
+# in its first caller's context, so work is only shared within an ai_queue:
+# a user never waits in (or is rejected by) the guest queue.
+prompt_flight = SingleFlight("prompt")  # keyed by queue + exact prompt
+result_flight = SingleFlight("result")  # keyed by queue + response cache key
 
 def split_text_into_chunks(text: str, max_size: int = MAX_CHUNK_SIZE) -> List[str]:
     """
@@ -55,93 +62,251 @@ def split_text_into_chunks(text: str, max_size: int = MAX_CHUNK_SIZE) -> List[st
         
     return chunks
 
-def call_gemini(prompt: str) -> str:
-    # 1. Rate Limiting Sleep
-    # Identify if we need to sleep BEFORE or AFTER. 
-    # Safest is before if we want to guarantee spacing between calls from this worker.
-    # Users requested 4 seconds.
-    time.sleep(RPM_SLEEP)
-
-    # 2. Try to get key from DB
+async def get_api_key() -> Optional[str]:
+    # 1. Try to get key from DB (cached, see SystemConfigCache)
     api_key = None
     try:
-        with Session(engine) as session:
-            config = session.get(SystemConfig, "gemini_api_key")
-            if config:
-                api_key = encryption_service.decrypt(config.value)
+        api_key = await system_config_cache.aget("gemini_api_key")
     except Exception as e:
         print(f"Error fetching API key from DB: {e}")
 
-    # 3. Fallback to env file
+    # 2. Fallback to env file
     if not api_key:
         api_key = settings.GEMINI_API_KEY
+    return api_key
 
-    if not api_key:
-        return "Error: GEMINI_API_KEY not configured."
-    
-    url = f"{GEMINI_API_URL}?key={api_key}"
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
-    }
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 429:
-                wait_time = (2 ** attempt) + RPM_SLEEP # Exponential backoff + Safety buffer
-                print(f"Rate limited (429). Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                continue
-                
-            response.raise_for_status()
-            data = response.json()
-            return data['candidates'][0]['content']['parts'][0]['text']
-            
-        except requests.exceptions.RequestException as e:
-            if attempt == max_retries - 1:
-                print(f"Gemini API Error after {max_retries} retries: {e}")
-                return f"Error calling Gemini API: {e}"
-            # Add a small delay handled by the loop/sleep above if we continue, 
-            # but for non-429 errors, maybe just a short retry or fail is better.
-            # We'll just continue to retry.
-            time.sleep(2) 
-            continue
-        except (KeyError, IndexError) as e:
-            print(f"Gemini Response Parse Error: {e}")
-            return "Error parsing AI response."
-            
-    return "Error: Failed to connect to AI service."
-
-def summarize_text(text: str) -> str:
-    # Note: Summarization for very large texts usually requires map-reduce. 
-    # For now, we apply basic chunking if it exceeds limit, but 
-    # ideally we would summarize chunks then summarize the result.
-    # Given the prompt focused on translation chunking, we'll keep this simple for now
-    # or apply the same chunking but just call it once if safe.
-    # However, if text > 20k, single call fails.
-    # Let's truncate or let user know. For strictness to user request, 
-    # "Implement Chunking for Translation".
-    return call_gemini(f"Summarize this text concisely: {text}")
-
-def translate_text(text: str, target_lang: str) -> str:
+class ChunkError(Exception):
+    """A chunk failed for good; `index` is its 0-based position."""
+
+    def __init__(self, index: int, error: GeminiError):
+        super().__init__(str(error))
+        self.index = index
+        self.error = error
+
+async def generate(prompt: str, json_output: bool = False) -> str:
+    """
+    Call Gemini and return its text, raising GeminiError on failure.
+    Rate limiting is handled by the client's token-bucket scheduler.
+    Concurrent calls with the same prompt (in the same ai_queue) share one request.
+    """
+    async def call() -> str:
+        api_key = await get_api_key()
+        if not api_key:
+            raise GeminiError("Error: GEMINI_API_KEY not configured.")
+        return await gemini_client.generate(prompt, api_key, json_output=json_output)
+
+    key = hashlib.sha256(f"{ai_queue.get()}:{json_output}:{prompt}".encode("utf-8")).hexdigest()
+    return await prompt_flight.do(key, call)
+
+async def call_gemini(prompt: str) -> str:
+    try:
+        return await generate(prompt)
+    except GeminiError as e:
+        return str(e)
+
+async def generate_many(prompts: List[str], max_concurrency: int) -> List[str]:
+    """
+    Run `prompts` concurrently with at most `max_concurrency` in flight
+    and return the results in input order.
+    Transient failures are retried by the Gemini client (GEMINI_MAX_RETRIES);
+    the first failure left after that cancels the prompts still running and
+    raises ChunkError (GeminiUnavailable is raised as is).
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(index: int, prompt: str) -> str:
+        async with semaphore:
+            try:
+                return await generate(prompt)
+            except GeminiUnavailable:
+                raise
+            except GeminiError as e:
+                raise ChunkError(index, e)
+
+    tasks = [asyncio.create_task(run(i, p)) for i, p in enumerate(prompts)]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+def failure_message(action_type: str, error: Exception) -> str:
+    """Message shown for a failed summary or translation (GeminiError or ChunkError)."""
+    if isinstance(error, ChunkError):
+        if action_type == "translate":
+            return f"Translation failed at chunk {error.index + 1}: {error}"
+        return f"Summarization failed: {error}"
+    return str(error)
+
+async def _cached(key: str, compute) -> str:
+    """Serve `key` from the response cache, or compute it once (single-flight) and cache it."""
+    cached = await response_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def run() -> str:
+        result = await compute()
+        await response_cache.set(key, result)  # Only reached on success
+        return result
+
+    return await result_flight.do(f"{ai_queue.get()}:{key}", run)
+
+async def summarize(text: str) -> str:
+    """Summary of `text`; raises GeminiError or ChunkError on failure."""
+    key = make_cache_key("summarize", text, version=CACHE_VERSION)
+    return await _cached(key, lambda: _summarize(text))
+
+async def translate(text: str, target_lang: str) -> str:
+    """Translation of `text`; raises GeminiError or ChunkError on failure."""
+    key = make_cache_key("translate", text, target_lang, version=CACHE_VERSION)
+    return await _cached(key, lambda: _translate(text, target_lang))
+
+async def summarize_text(text: str) -> str:
+    """
+    summarize() for the /tools routes: failures are returned as the error
+    message (GeminiUnavailable is raised, the routes answer 503).
+    """
+    try:
+        return await summarize(text)
+    except GeminiUnavailable:
+        raise
+    except (GeminiError, ChunkError) as e:
+        return failure_message("summarize", e)
+
+async def translate_text(text: str, target_lang: str) -> str:
+    """translate() for the /tools routes, returning failures like summarize_text."""
+    try:
+        return await translate(text, target_lang)
+    except GeminiUnavailable:
+        raise
+    except (GeminiError, ChunkError) as e:
+        return failure_message("translate", e)
+
+async def _summarize(text: str) -> str:
+    return await generate(await _summary_prompt(text))
+
+async def _summary_prompt(text: str) -> str:
+    """
+    Hierarchical (map-reduce) summarization; returns the final prompt.
+    Texts that fit one call are summarized directly. Larger texts are split
+    with split_text_into_chunks, the chunks are summarized concurrently
+    (map), then groups of up to SUMMARY_FAN_IN partial summaries that fit
+    MAX_CHUNK_SIZE together are merged (reduce) level by level until they
+    fit one final call. Latency grows with the depth of the tree, not with
+    the length of the document. If SUMMARY_MAX_DEPTH is reached first, the
+    partials are trimmed so the final prompt still fits.
+    """
     chunks = split_text_into_chunks(text)
-    translated_chunks = []
-    
-    for i, chunk in enumerate(chunks):
-        if len(chunks) > 1:
-            print(f"Translating chunk {i+1}/{len(chunks)}...")
-            
-        prompt = f"Translate the following text to {target_lang}. Return ONLY the translation: {chunk}"
-        result = call_gemini(prompt)
-        
-        if result.startswith("Error"):
-             return f"Translation failed at chunk {i+1}: {result}"
-             
-        translated_chunks.append(result)
-        
+    if len(chunks) == 1:
+        return f"Summarize this text concisely: {text}"
+
+    print(f"Summarizing {len(chunks)} chunks concurrently...")
+    fan_in = max(2, settings.SUMMARY_FAN_IN)
+
+    # 1. Map: summarize every chunk
+    partials = await generate_many(
+        [f"Summarize this part of a longer text concisely: {chunk}" for chunk in chunks],
+        settings.SUMMARIZE_MAX_CONCURRENCY,
+    )
+
+    # 2. Reduce: merge groups of partial summaries until they fit one call
+    depth = 1
+    while (
+        len(partials) > fan_in or len("\n\n".join(partials)) > MAX_CHUNK_SIZE
+    ) and depth < settings.SUMMARY_MAX_DEPTH:
+        partials = await generate_many(
+            [_reduce_prompt(group, final=False) for group in _reduce_groups(partials, fan_in)],
+            settings.SUMMARIZE_MAX_CONCURRENCY,
+        )
+        depth += 1
+
+    # 3. Final summary prompt
+    if len("\n\n".join(partials)) > MAX_CHUNK_SIZE:
+        print(f"WARNING: summary tree reached SUMMARY_MAX_DEPTH, trimming {len(partials)} partial summaries")
+        share = max(1, (MAX_CHUNK_SIZE - 2 * (len(partials) - 1)) // len(partials))
+        partials = [partial[:share] for partial in partials]
+    return _reduce_prompt(partials, final=True)
+
+def _reduce_groups(partials: List[str], fan_in: int) -> List[List[str]]:
+    """Consecutive groups of at most `fan_in` partials whose joined text fits MAX_CHUNK_SIZE."""
+    groups: List[List[str]] = []
+    size = 0
+    for partial in partials:
+        if groups and len(groups[-1]) < fan_in and size + 2 + len(partial) <= MAX_CHUNK_SIZE:
+            groups[-1].append(partial)
+            size += 2 + len(partial)
+        else:
+            groups.append([partial])
+            size = len(partial)
+    return groups
+
+def _reduce_prompt(summaries: List[str], final: bool) -> str:
+    joined = "\n\n".join(summaries)
+    if final:
+        return (
+            "The following are summaries of consecutive parts of one text. "
+            f"Combine them into a single concise summary of the whole text: {joined}"
+        )
+    return (
+        "The following are summaries of consecutive parts of one text. "
+        f"Merge them into one concise summary, keeping the key points: {joined}"
+    )
+
+async def _translate(text: str, target_lang: str) -> str:
+    chunks = split_text_into_chunks(text)
+    if len(chunks) > 1:
+        print(f"Translating {len(chunks)} chunks concurrently...")
+
+    prompts = [_translate_prompt(chunk, target_lang) for chunk in chunks]
+    translated_chunks = await generate_many(prompts, settings.TRANSLATE_MAX_CONCURRENCY)
     return " ".join(translated_chunks)
+
+def _translate_prompt(chunk: str, target_lang: str) -> str:
+    return f"Translate the following text to {target_lang}. Return ONLY the translation: {chunk}"
+
+async def _stream(prompt: str) -> AsyncIterator[str]:
+    api_key = await get_api_key()
+    if not api_key:
+        raise GeminiError("Error: GEMINI_API_KEY not configured.")
+    async for piece in gemini_client.stream(prompt, api_key):
+        yield piece
+
+async def stream_summarize(text: str) -> AsyncIterator[str]:
+    """
+    Stream a summary. Long texts run the map-reduce levels first, then the
+    final summary is streamed. Raises GeminiError/ChunkError on failure.
+    """
+    key = make_cache_key("summarize", text, version=CACHE_VERSION)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    async for piece in _stream(await _summary_prompt(text)):
+        pieces.append(piece)
+        yield piece
+    await response_cache.set(key, "".join(pieces))
+
+async def stream_translate(text: str, target_lang: str) -> AsyncIterator[str]:
+    """
+    Stream a translation chunk by chunk, in order.
+    Raises GeminiError on failure.
+    """
+    key = make_cache_key("translate", text, target_lang, version=CACHE_VERSION)
+    cached = await response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    for i, chunk in enumerate(split_text_into_chunks(text)):
+        if i > 0:
+            pieces.append(" ")
+            yield " "
+        async for piece in _stream(_translate_prompt(chunk, target_lang)):
+            pieces.append(piece)
+            yield piece
+    await response_cache.set(key, "".join(pieces))
@@ -0,0 +1,162 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.ai_service import (
+    CACHE_VERSION,
+    ChunkError,
+    failure_message,
+    generate,
+    summarize,
+    translate,
+)
+from app.services.gemini_client import GeminiError, GeminiUnavailable
+from app.services.response_cache import make_cache_key, response_cache
+
+# (result, error) for each input item, in input order
+BatchResult = Tuple[Optional[str], Optional[str]]
+
+
+def pack_items(items: List[Tuple[int, str]], max_chars: int, max_items: int) -> List[List[Tuple[int, str]]]:
+    """
+    Greedily pack (index, text) items into groups whose combined text stays
+    within `max_chars` and `max_items`. Items larger than the budget get a
+    group of their own.
+    """
+    groups: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    size = 0
+    for index, text in items:
+        if current and (size + len(text) > max_chars or len(current) >= max_items):
+            groups.append(current)
+            current, size = [], 0
+        current.append((index, text))
+        size += len(text)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _batch_prompt(instruction: str, group: List[Tuple[int, str]]) -> str:
+    items = json.dumps([{"id": index, "text": text} for index, text in group], ensure_ascii=False)
+    return (
+        f"{instruction} The input is a JSON array of objects with an \"id\" and a \"text\". "
+        "Return ONLY a JSON array with one object per input item, each with the same \"id\" "
+        f"and a \"result\" string. Process every item independently.\n\nInput: {items}"
+    )
+
+
+def _parse_batch_response(raw: str) -> Dict[int, str]:
+    data = json.loads(raw)
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array")
+    results = {}
+    for item in data:
+        if isinstance(item, dict) and isinstance(item.get("result"), str):
+            try:
+                results[int(item["id"])] = item["result"]
+            except (KeyError, TypeError, ValueError):
+                continue
+    return results
+
+
+async def _run_batch(
+    texts: List[str],
+    operation: str,
+    instruction: str,
+    target_lang: str,
+    single,
+) -> List[BatchResult]:
+    """
+    Shared pipeline for batch operations:
+    1. serve what we can from the response cache, dedupe identical texts
+    2. pack the remaining small items into few JSON prompts
+    3. split the answers back per item; items the model dropped, and
+       items too large to pack, go through the single-item path
+    """
+    results: List[BatchResult] = [(None, None)] * len(texts)
+    keys = [make_cache_key(operation, text, target_lang, version=CACHE_VERSION) for text in texts]
+
+    # 1. Cache, and send each distinct text only once
+    pending: List[Tuple[int, str]] = []
+    first_index: Dict[str, int] = {}
+    duplicates: List[Tuple[int, int]] = []
+    for index, text in enumerate(texts):
+        if keys[index] in first_index:
+            duplicates.append((index, first_index[keys[index]]))
+            continue
+        first_index[keys[index]] = index
+        cached = await response_cache.get(keys[index])
+        if cached is not None:
+            results[index] = (cached, None)
+        else:
+            pending.append((index, text))
+
+    packable = [item for item in pending if len(item[1]) <= settings.BATCH_ITEM_MAX_CHARS]
+    fallback = [item for item in pending if len(item[1]) > settings.BATCH_ITEM_MAX_CHARS]
+
+    # 2. Packed calls (bounded concurrency, per-group error handling)
+    semaphore = asyncio.Semaphore(max(1, settings.BATCH_MAX_CONCURRENCY))
+
+    async def run_group(group: List[Tuple[int, str]]) -> None:
+        async with semaphore:
+            try:
+                raw = await generate(_batch_prompt(instruction, group), json_output=True)
+                answers = _parse_batch_response(raw)
+            except GeminiUnavailable:
+                raise  # The whole batch is answered with 503
+            except GeminiError as e:
+                for index, _ in group:
+                    results[index] = (None, str(e))
+                return
+            except ValueError as e:
+                print(f"Batch Response Parse Error: {e}")
+                for index, _ in group:
+                    results[index] = (None, "Error parsing AI response.")
+                return
+
+        for index, text in group:
+            if index in answers:
+                results[index] = (answers[index], None)
+                await response_cache.set(keys[index], answers[index])
+            else:
+                fallback.append((index, text))
+
+    groups = pack_items(packable, settings.BATCH_PROMPT_MAX_CHARS, settings.BATCH_PROMPT_MAX_ITEMS)
+    await asyncio.gather(*(run_group(group) for group in groups))
+
+    # 3. Single-item path (cached inside summarize/translate)
+    async def run_single(index: int, text: str) -> None:
+        async with semaphore:
+            try:
+                results[index] = (await single(text), None)
+            except GeminiUnavailable:
+                raise  # The whole batch is answered with 503
+            except (GeminiError, ChunkError) as e:
+                results[index] = (None, failure_message(operation, e))
+
+    await asyncio.gather(*(run_single(index, text) for index, text in fallback))
+
+    for index, original in duplicates:
+        results[index] = results[original]
+    return results
+
+
+async def batch_summarize(texts: List[str]) -> List[BatchResult]:
+    return await _run_batch(
+        texts,
+        operation="summarize",
+        instruction="Summarize the text of each item concisely.",
+        target_lang="",
+        single=summarize,
+    )
+
+
+async def batch_translate(texts: List[str], target_lang: str) -> List[BatchResult]:
+    return await _run_batch(
+        texts,
+        operation="translate",
+        instruction=f"Translate the text of each item to {target_lang}. Each result must be ONLY the translation.",
+        target_lang=target_lang,
+        single=lambda text: translate(text, target_lang),
+    )
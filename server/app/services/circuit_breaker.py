@@ -0,0 +1,151 @@
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+from app.core.config import settings
+
+
+class CircuitOpen(Exception):
+    """Calls are refused while the upstream recovers."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for an upstream service.
+
+    - closed: calls pass; their outcomes over the last `window` seconds are
+      kept. Once at least `min_calls` were made, it opens when the share of
+      failed calls, or of calls slower than `slow_seconds`, reaches
+      `failure_rate`.
+    - open: calls are refused (CircuitOpen) for `open_seconds`.
+    - half_open: up to `probes` trial calls run at a time; `probes`
+      successes close the circuit, any failure opens it again.
+
+    allow() returns whether the call is a trial call; pass that flag back to
+    record() exactly once when the call ends.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float,
+        min_calls: int,
+        failure_rate: float,
+        slow_seconds: float,
+        open_seconds: float,
+        probes: int,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.probes = max(1, probes)
+        self.state = "closed"
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()  # (time, failed, slow)
+        self._opened_at = 0.0
+        self._probes_running = 0
+        self._probe_successes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def _refresh(self, now: float) -> None:
+        if self.state == "open" and now - self._opened_at >= self.open_seconds:
+            self.state = "half_open"
+            self._probes_running = 0
+            self._probe_successes = 0
+
+    def _open(self, now: float) -> None:
+        if self.state != "open":
+            print(f"Circuit breaker {self.name}: open for {self.open_seconds:.0f}s")
+            self.opened += 1
+        self.state = "open"
+        self._opened_at = now
+        self._calls.clear()
+
+    def retry_after(self) -> float:
+        """Seconds until a call may be allowed again, 0 when one would be now."""
+        now = time.monotonic()
+        self._refresh(now)
+        if self.state == "open":
+            return max(1.0, self.open_seconds - (now - self._opened_at))
+        if self.state == "half_open" and self._probes_running >= self.probes:
+            return 1.0
+        return 0.0
+
+    def check(self) -> float:
+        """retry_after() for callers that fail fast up front; refusals are counted."""
+        retry_after = self.retry_after()
+        if retry_after:
+            self.rejected += 1
+        return retry_after
+
+    def is_open(self) -> bool:
+        self._refresh(time.monotonic())
+        return self.state == "open"
+
+    def allow(self) -> bool:
+        """Admit one call or raise CircuitOpen. Returns True for a trial call."""
+        retry_after = self.check()
+        if retry_after:
+            raise CircuitOpen(self.name, retry_after)
+        if self.state == "half_open":
+            self._probes_running += 1
+            return True
+        return False
+
+    def record(self, probe: bool, ok: Optional[bool], latency: float) -> None:
+        """
+        Report the end of an allowed call. `ok` is None when the call says
+        nothing about the upstream's health (cancelled, rejected request).
+        """
+        now = time.monotonic()
+        if probe and self.state == "half_open":
+            self._probes_running = max(0, self._probes_running - 1)
+            if ok is False:
+                self._open(now)
+            elif ok:
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    print(f"Circuit breaker {self.name}: closed")
+                    self.state = "closed"
+            return
+        if self.state != "closed" or ok is None:
+            return  # Calls sent before the circuit opened
+
+        self._calls.append((now, not ok, latency > self.slow_seconds))
+        while self._calls and self._calls[0][0] < now - self.window:
+            self._calls.popleft()
+        total = len(self._calls)
+        if total < self.min_calls:
+            return
+        failed = sum(1 for _, is_failed, _ in self._calls if is_failed)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        if failed / total >= self.failure_rate or slow / total >= self.failure_rate:
+            self._open(now)
+
+    def stats(self) -> dict:
+        self._refresh(time.monotonic())
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_failed": sum(1 for _, is_failed, _ in self._calls if is_failed),
+            "window_slow": sum(1 for _, _, is_slow in self._calls if is_slow),
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+gemini_breaker = CircuitBreaker(
+    "Gemini",
+    window=settings.GEMINI_BREAKER_WINDOW,
+    min_calls=settings.GEMINI_BREAKER_MIN_CALLS,
+    failure_rate=settings.GEMINI_BREAKER_FAILURE_RATE,
+    slow_seconds=settings.GEMINI_SLOW_CALL_SECONDS,
+    open_seconds=settings.GEMINI_BREAKER_OPEN_SECONDS,
+    probes=settings.GEMINI_BREAKER_PROBES,
+)
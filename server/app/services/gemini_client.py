@@ -0,0 +1,282 @@
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import httpx
+from app.core.config import settings
+from app.services.adaptive_concurrency import AdaptiveConcurrency, gemini_concurrency
+from app.services.circuit_breaker import CircuitBreaker, CircuitOpen, gemini_breaker
+from app.services.rate_limiter import QueueRejected, RateScheduler, estimate_tokens, gemini_scheduler
+
+GEMINI_MODEL = "gemini-flash-latest"
+GEMINI_API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:streamGenerateContent"
+
+
+class GeminiError(Exception):
+    """Raised when the Gemini API cannot produce a result."""
+
+    def __init__(
+        self,
+        message: str,
+        status_code: Optional[int] = None,
+        retryable: bool = False,
+        retry_after: Optional[float] = None,
+    ):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retryable = retryable  # Transient failure (network, 429, 5xx)
+        self.retry_after = retry_after  # Seconds before the service should be tried again
+
+
+class GeminiUnavailable(GeminiError):
+    """
+    The call was not sent: the service is shedding load (queue full) or
+    refusing calls. Surfaced to clients as 503 rather than as a result.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message, status_code=503, retry_after=retry_after)
+
+
+class _Attempt:
+    """Outcome of one HTTP attempt: ok, error, throttled (429), or None (no verdict)."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.outcome: Optional[str] = None
+        self.latency = 0.0
+
+    def done(self, outcome: Optional[str]) -> None:
+        self.outcome = outcome
+        self.latency = time.monotonic() - self.started
+
+
+class GeminiClient:
+    """
+    Async Gemini client.
+    One pooled httpx.AsyncClient is shared by every request in the process,
+    so connections (and TLS sessions) are reused instead of opened per call.
+    Every attempt goes through the circuit breaker, the rate scheduler and
+    the adaptive concurrency limit, in that order.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+        scheduler: Optional[RateScheduler] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+    ):
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.scheduler = scheduler
+        self.breaker = breaker
+        self.concurrency = concurrency
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"Content-Type": "application/json"},
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _unavailable(self, retry_after: float) -> GeminiUnavailable:
+        return GeminiUnavailable(
+            f"Error: AI service temporarily unavailable, retry in {retry_after:.0f}s",
+            retry_after=retry_after,
+        )
+
+    @asynccontextmanager
+    async def _attempt(self, tokens: int) -> AsyncIterator[_Attempt]:
+        """
+        Admit one HTTP attempt. The caller reports its outcome with
+        attempt.done(); it is passed to the breaker and the concurrency
+        limit when the attempt ends.
+        Admission failures raise GeminiUnavailable (503, not retried): waiting
+        again would only queue behind the same load.
+        """
+        probe = False
+        if self.breaker is not None:
+            try:
+                probe = self.breaker.allow()
+            except CircuitOpen as e:
+                raise self._unavailable(e.retry_after)
+        attempt: Optional[_Attempt] = None
+        try:
+            if self.scheduler is not None:
+                try:
+                    await self.scheduler.acquire(tokens)
+                except QueueRejected as e:
+                    raise GeminiUnavailable(f"Error: {e}", retry_after=e.retry_after)
+            if self.concurrency is not None:
+                try:
+                    await self.concurrency.acquire(timeout=self.timeout)
+                except asyncio.TimeoutError:
+                    raise GeminiUnavailable("Error: AI service is busy, please retry later.")
+            attempt = _Attempt()
+            try:
+                yield attempt
+            finally:
+                if self.concurrency is not None:
+                    self.concurrency.release(attempt.outcome, attempt.started, attempt.latency)
+        finally:
+            if self.breaker is not None:
+                if attempt is None or attempt.outcome is None:
+                    self.breaker.record(probe, None, 0.0)
+                else:
+                    self.breaker.record(probe, attempt.outcome == "ok", attempt.latency)
+
+    def _outcome(self, error: GeminiError) -> Optional[str]:
+        if error.status_code == 429:
+            return "throttled"
+        # Client errors (bad key, bad request) say nothing about the upstream's health
+        return "error" if error.retryable else None
+
+    def _check_circuit(self) -> None:
+        """Fail fast once the breaker has opened, instead of retrying or returning the last error."""
+        if self.breaker is not None and self.breaker.is_open():
+            raise self._unavailable(self.breaker.retry_after())
+
+    async def _before_retry(self, attempt: int, error: GeminiError) -> None:
+        self._check_circuit()
+        wait_time = self._backoff(attempt, error.status_code)
+        print(f"{error} Retrying in {wait_time:.1f}s...")
+        await asyncio.sleep(wait_time)
+
+    def _backoff(self, attempt: int, status_code: Optional[int]) -> float:
+        if status_code == 429:
+            # Exponential backoff; the scheduler already spaces normal traffic
+            return 2 ** (attempt + 1) + random.random()
+        return 2 * (attempt + 1) + random.random()
+
+    def _status_error(self, status_code: int) -> GeminiError:
+        return GeminiError(
+            f"Error calling Gemini API: HTTP {status_code}",
+            status_code=status_code,
+            # Client errors (bad key, bad request) will not fix themselves
+            retryable=status_code == 429 or status_code >= 500,
+        )
+
+    async def generate(self, prompt: str, api_key: str, json_output: bool = False) -> str:
+        """
+        Send a prompt to Gemini and return the generated text.
+        Retries transport errors, 429 and 5xx responses with backoff.
+        Every attempt, retries included, goes through the rate scheduler.
+        `json_output` asks the model for a JSON response body.
+        """
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        if json_output:
+            payload["generationConfig"] = {"responseMimeType": "application/json"}
+        tokens = estimate_tokens(prompt)
+        last_error: Optional[GeminiError] = None
+
+        for attempt in range(self.max_retries):
+            async with self._attempt(tokens) as call:
+                try:
+                    response = await self.client.post(
+                        GEMINI_API_URL, params={"key": api_key}, json=payload
+                    )
+                except httpx.HTTPError as e:
+                    last_error = GeminiError(f"Error calling Gemini API: {e}", retryable=True)
+                    call.done("error")
+                else:
+                    if response.status_code >= 400:
+                        last_error = self._status_error(response.status_code)
+                        call.done(self._outcome(last_error))
+                        if not last_error.retryable:
+                            raise last_error
+                    else:
+                        call.done("ok")
+                        try:
+                            data = response.json()
+                            return data['candidates'][0]['content']['parts'][0]['text']
+                        except (ValueError, KeyError, IndexError) as e:
+                            print(f"Gemini Response Parse Error: {e}")
+                            raise GeminiError("Error parsing AI response.")
+
+            if attempt < self.max_retries - 1:
+                await self._before_retry(attempt, last_error)
+
+        self._check_circuit()
+        print(f"Gemini API Error after {self.max_retries} retries: {last_error}")
+        raise last_error
+
+    async def stream(self, prompt: str, api_key: str) -> AsyncIterator[str]:
+        """
+        Stream generated text from Gemini as it is produced (SSE endpoint).
+        Failures are retried like generate() as long as nothing has been
+        yielded yet; once text has been sent a failure is raised as is.
+        """
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        tokens = estimate_tokens(prompt)
+        last_error: Optional[GeminiError] = None
+
+        for attempt in range(self.max_retries):
+            async with self._attempt(tokens) as call:
+                yielded = False
+                try:
+                    async with self.client.stream(
+                        "POST", GEMINI_STREAM_URL, params={"key": api_key, "alt": "sse"}, json=payload
+                    ) as response:
+                        if response.status_code >= 400:
+                            last_error = self._status_error(response.status_code)
+                            call.done(self._outcome(last_error))
+                            if not last_error.retryable:
+                                raise last_error
+                        else:
+                            call.done("ok")  # Latency up to the response headers
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                try:
+                                    data = json.loads(line[5:])
+                                    parts = data['candidates'][0]['content'].get('parts', [])
+                                except (ValueError, KeyError, IndexError) as e:
+                                    print(f"Gemini Stream Parse Error: {e}")
+                                    raise GeminiError("Error parsing AI response.")
+                                for part in parts:
+                                    if part.get("text"):
+                                        yielded = True
+                                        yield part["text"]
+                            return
+                except httpx.HTTPError as e:
+                    last_error = GeminiError(f"Error calling Gemini API: {e}", retryable=True)
+                    call.done("error")
+                    if yielded:
+                        raise last_error
+
+            if attempt < self.max_retries - 1:
+                await self._before_retry(attempt, last_error)
+
+        self._check_circuit()
+        print(f"Gemini API Error after {self.max_retries} retries: {last_error}")
+        raise last_error
+
+
+gemini_client = GeminiClient(
+    max_connections=settings.GEMINI_MAX_CONNECTIONS,
+    timeout=settings.GEMINI_TIMEOUT,
+    max_retries=settings.GEMINI_MAX_RETRIES,
+    scheduler=gemini_scheduler,
+    breaker=gemini_breaker,
+    concurrency=gemini_concurrency,
+)
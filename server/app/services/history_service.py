@@ -0,0 +1,210 @@
+import asyncio
+import csv
+import io
+import json
+import time
+import zlib
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import delete, insert, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.config import settings
+from app.core.database import async_engine
+from app.models.history import History
+from app.services.search_service import index_history, unindex_history
+
+
+async def bulk_delete_history(session: AsyncSession, user_id: int, action_type: str) -> int:
+    """
+    Delete every History row of `user_id` with `action_type` using
+    set-based DELETE statements instead of loading rows into the ORM.
+    Rows are removed in batches of HISTORY_DELETE_BATCH_SIZE, each in its
+    own transaction (together with their search index entries), so a very
+    large purge never holds a long write lock.
+    Returns the number of deleted rows.
+    """
+    batch_size = max(1, settings.HISTORY_DELETE_BATCH_SIZE)
+    deleted = 0
+    while True:
+        ids = (await session.execute(
+            select(History.id)
+            .where(History.user_id == user_id, History.action_type == action_type)
+            .limit(batch_size)
+        )).scalars().all()
+        if not ids:
+            return deleted
+        await session.run_sync(lambda sync_session: unindex_history(sync_session.connection(), ids))
+        await session.execute(
+            delete(History)
+            .where(History.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "jsonl.gz": ("application/gzip", "jsonl.gz"),
+    "csv.gz": ("application/gzip", "csv.gz"),
+}
+EXPORT_FIELDS = ["id", "action_type", "original_text", "summary_text", "translated_text", "target_lang", "created_at"]
+
+
+def _serialize_rows(rows: List[History], as_csv: bool) -> bytes:
+    records = [row.model_dump(mode="json", include=set(EXPORT_FIELDS)) for row in rows]
+    if as_csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerows([record[field] for field in EXPORT_FIELDS] for record in records)
+        return buffer.getvalue().encode("utf-8")
+    return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records).encode("utf-8")
+
+
+async def export_history(user_id: int, format: str, action_type: Optional[str] = None) -> AsyncIterator[bytes]:
+    """
+    Stream a user's history, oldest first, as NDJSON or CSV (optionally gzipped).
+
+    Rows are read through a server-side cursor HISTORY_EXPORT_BATCH_SIZE at
+    a time and each batch is serialized (and compressed) before the next
+    one is fetched, so memory use does not depend on the number of rows.
+    The generator opens its own session: it runs after the request
+    dependencies have been cleaned up.
+    """
+    statement = select(History).where(History.user_id == user_id)
+    if action_type:
+        statement = statement.where(History.action_type == action_type)
+    statement = statement.order_by(History.created_at, History.id).execution_options(
+        yield_per=max(1, settings.HISTORY_EXPORT_BATCH_SIZE)
+    )
+
+    as_csv = format.startswith("csv")
+    # wbits=31: gzip container, readable by gunzip
+    compressor = zlib.compressobj(wbits=31) if format.endswith(".gz") else None
+
+    def encode(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    if as_csv:
+        yield encode((",".join(EXPORT_FIELDS) + "\r\n").encode("utf-8"))
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream_scalars(statement)
+        async for rows in result.partitions():
+            data = encode(_serialize_rows(rows, as_csv))
+            if data:
+                yield data
+    if compressor:
+        yield compressor.flush()
+
+
+class HistoryRecorder:
+    """
+    Write-behind recorder for History rows.
+
+    Request handlers enqueue rows and return right away; a background task
+    drains the bounded queue and writes them with one multi-row INSERT per
+    batch, flushing when `batch_size` rows are waiting or `flush_interval`
+    seconds have passed. When the queue is full, record() waits for room
+    (backpressure) instead of dropping rows. stop() flushes what is left.
+    A batch that still fails after its retries is dropped and logged with
+    the affected users; when not running, record() raises instead.
+    """
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.max_queue = max_queue
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        await self._queue.join()  # Let the writer drain everything queued
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def record(self, *entries: History) -> None:
+        if not self.running:
+            # Not started (e.g. write-behind disabled): write synchronously
+            await self._write(list(entries))
+            return
+        for entry in entries:
+            await self._queue.put(entry)
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._write(batch)
+            except Exception as e:
+                user_ids = sorted({entry.user_id for entry in batch})
+                print(f"ERROR: dropped {len(batch)} history rows (user_ids {user_ids}): {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: List[History], attempts: int = 3) -> None:
+        """Insert `batch` (and index it), retrying; raises the last error if every attempt failed."""
+        if not batch:
+            return
+        # preview is left out so its column default fills it in
+        rows = [entry.model_dump(exclude={"id", "preview"}) for entry in batch]
+        for attempt in range(attempts):
+            try:
+                async with AsyncSession(async_engine) as session:
+                    result = await session.execute(
+                        insert(History).returning(History.id, sort_by_parameter_order=True), rows
+                    )
+                    indexed = [dict(row, id=id) for row, id in zip(rows, result.scalars().all())]
+                    await session.run_sync(lambda sync_session: index_history(sync_session.connection(), indexed))
+                    await session.commit()
+                self.written += len(rows)
+                self.batches += 1
+                return
+            except Exception as e:
+                print(f"Error writing {len(rows)} history rows (attempt {attempt + 1}): {e}")
+                if attempt + 1 == attempts:
+                    self.failed += len(rows)
+                    raise
+                await asyncio.sleep(0.5 * (attempt + 1))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+        }
+
+
+history_recorder = HistoryRecorder(
+    max_queue=settings.HISTORY_QUEUE_SIZE,
+    batch_size=settings.HISTORY_BATCH_SIZE,
+    flush_interval=settings.HISTORY_FLUSH_INTERVAL,
+)
@@ -0,0 +1,196 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+from sqlalchemy import delete, update
+from sqlmodel import Session, select
+from app.core.config import settings
+from app.core.database import engine
+from app.models.history import History
+from app.models.job import Job
+from app.services.ai_service import ChunkError, failure_message, summarize, translate
+from app.services.gemini_client import GeminiError
+from app.services.rate_limiter import ai_queue
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+class JobQueue:
+    """
+    Background execution of AI jobs.
+
+    Jobs are stored in the Job table; this process runs them with a pool of
+    `concurrency` asyncio workers. A job is claimed with a conditional
+    UPDATE (pending -> running), so several uvicorn workers can share the
+    table without running the same job twice.
+    """
+
+    def __init__(self, concurrency: int):
+        self.concurrency = max(1, concurrency)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._events: Dict[str, asyncio.Event] = {}
+        self._running: Set[str] = set()  # Jobs claimed by this process
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        for job_id in await asyncio.to_thread(self._recover):
+            self._queue.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._running:
+            # Interrupted jobs go back to pending instead of waiting JOB_STALE_SECONDS
+            await asyncio.to_thread(self._release, list(self._running))
+            self._running.clear()
+
+    def submit(self, job_id: str) -> None:
+        """Queue a job that has already been committed to the database."""
+        self._events[job_id] = asyncio.Event()
+        self._queue.put_nowait(job_id)
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """
+        Wait up to `timeout` seconds for a job to finish.
+        Jobs run by this process wake the waiter immediately; others
+        (submitted to another worker) are simply re-checked by the caller.
+        """
+        event = self._events.get(job_id)
+        if event is None:
+            await asyncio.sleep(timeout)
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _worker(self) -> None:
+        ai_queue.set("background")  # Jobs yield to interactive requests
+        while True:
+            job_id = await self._queue.get()
+            try:
+                try:
+                    await self._run(job_id)
+                except Exception as e:
+                    print(f"Job {job_id} crashed: {e}")
+                    await asyncio.to_thread(self._finish, job_id, None, str(e))
+                # Not reached when cancelled: the job stays in _running and
+                # stop() returns it to pending
+                self._running.discard(job_id)
+            finally:
+                event = self._events.pop(job_id, None)
+                if event:
+                    event.set()
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            return  # Already claimed by another worker
+        self._running.add(job_id)
+
+        payload = json.loads(job.payload)
+        try:
+            if job.action_type == "summarize":
+                result = await summarize(payload["text"])
+            else:
+                result = await translate(payload["text"], payload["target_lang"])
+        except (GeminiError, ChunkError) as e:
+            await asyncio.to_thread(self._finish, job_id, None, failure_message(job.action_type, e))
+        else:
+            await asyncio.to_thread(self._finish, job_id, result, None)
+
+    def _claim(self, job_id: str) -> Optional[Job]:
+        with Session(engine) as session:
+            claimed = session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "pending")
+                .values(status="running", started_at=datetime.utcnow())
+            )
+            session.commit()
+            if claimed.rowcount != 1:
+                return None
+            return session.get(Job, job_id)
+
+    def _finish(self, job_id: str, result: Optional[str], error: Optional[str]) -> None:
+        with Session(engine) as session:
+            job = session.get(Job, job_id)
+            if job is None:
+                return
+            job.status = "failed" if error else "done"
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.utcnow()
+            session.add(job)
+
+            # Save History (Users only, successful jobs)
+            if job.user_id and not error:
+                payload = json.loads(job.payload)
+                session.add(History(
+                    user_id=job.user_id,
+                    original_text=payload["text"],
+                    summary_text=result if job.action_type == "summarize" else "",
+                    translated_text=result if job.action_type == "translate" else "",
+                    target_lang=payload.get("target_lang"),
+                    action_type=job.action_type,
+                ))
+            session.commit()
+
+        if error:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    def _release(self, job_ids: List[str]) -> None:
+        with Session(engine) as session:
+            session.execute(
+                update(Job)
+                .where(Job.id.in_(job_ids), Job.status == "running")
+                .values(status="pending", started_at=None)
+            )
+            session.commit()
+        print(f"Returned {len(job_ids)} interrupted job(s) to the queue")
+
+    def _recover(self) -> List[str]:
+        """
+        Pick up jobs left behind by a restart: stale `running` jobs go back
+        to `pending`, and old finished jobs are pruned.
+        """
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            session.execute(
+                update(Job)
+                .where(
+                    Job.status == "running",
+                    Job.started_at < now - timedelta(seconds=settings.JOB_STALE_SECONDS),
+                )
+                .values(status="pending", started_at=None)
+            )
+            session.execute(
+                delete(Job).where(
+                    Job.status.in_(FINISHED_STATUSES),
+                    Job.finished_at < now - timedelta(hours=settings.JOB_RETENTION_HOURS),
+                )
+            )
+            session.commit()
+            pending = session.exec(
+                select(Job.id).where(Job.status == "pending").order_by(Job.created_at)
+            ).all()
+        return list(pending)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+job_queue = JobQueue(concurrency=settings.JOB_WORKERS)
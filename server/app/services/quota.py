@@ -0,0 +1,242 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple
+from app.core.config import settings
+
+WINDOW_SECONDS = 60
+DAY_SECONDS = 24 * 60 * 60
+PRUNE_EVERY = 1000  # Calls between removals of expired counters
+
+
+class TierLimits(NamedTuple):
+    max_chars: int  # Characters per text
+    requests_per_minute: int
+    daily_chars: int
+    daily_tokens: int
+
+
+TIERS: Dict[str, TierLimits] = {
+    "guest": TierLimits(
+        max_chars=settings.GUEST_MAX_CHARS,
+        requests_per_minute=settings.GUEST_REQUESTS_PER_MINUTE,
+        daily_chars=settings.GUEST_DAILY_CHARS,
+        daily_tokens=settings.GUEST_DAILY_TOKENS,
+    ),
+    "user": TierLimits(
+        max_chars=settings.USER_MAX_CHARS,
+        requests_per_minute=settings.USER_REQUESTS_PER_MINUTE,
+        daily_chars=settings.USER_DAILY_CHARS,
+        daily_tokens=settings.USER_DAILY_TOKENS,
+    ),
+}
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, kind: str, message: str, retry_after: float):
+        super().__init__(message)
+        self.kind = kind  # requests, chars, tokens
+        self.message = message
+        self.retry_after = retry_after
+
+
+class QuotaCharge(NamedTuple):
+    """What consume() counted, so that it can be given back with refund()."""
+    keys: Dict[str, float]  # counter key -> expires_at
+    amounts: Dict[str, float]
+
+
+# Reads the current counter values and returns the increments to apply,
+# or raises QuotaExceeded (nothing is written then)
+CounterUpdate = Callable[[Dict[str, float]], Dict[str, float]]
+
+
+class LocalQuotaBackend:
+    """Counters held in process memory. Each worker enforces its own share."""
+
+    shared = False
+
+    def __init__(self):
+        self._counters: Dict[str, List[float]] = {}  # key -> [value, expires_at]
+        self._lock = threading.Lock()
+
+    def apply(self, keys: Dict[str, float], update: CounterUpdate, now: float) -> None:
+        with self._lock:
+            current = {key: self._counters.get(key, [0.0, 0.0])[0] for key in keys}
+            for key, amount in update(current).items():
+                self._counters[key] = [current[key] + amount, keys[key]]
+
+    def prune(self, now: float) -> None:
+        with self._lock:
+            for key in [key for key, (_, expires) in self._counters.items() if expires < now]:
+                del self._counters[key]
+
+
+class SQLiteQuotaBackend:
+    """
+    Counters stored in a local SQLite file shared by every worker on the
+    host. BEGIN IMMEDIATE serializes the check-and-increment between
+    processes; each thread keeps its own connection.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS quota_counter ("
+            "key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def apply(self, keys: Dict[str, float], update: CounterUpdate, now: float) -> None:
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            placeholders = ",".join("?" for _ in keys)
+            rows = conn.execute(
+                f"SELECT key, value FROM quota_counter WHERE key IN ({placeholders}) AND expires_at >= ?",
+                [*keys, now],
+            ).fetchall()
+            current = {key: 0.0 for key in keys}
+            current.update(dict(rows))
+            conn.executemany(
+                "INSERT OR REPLACE INTO quota_counter (key, value, expires_at) VALUES (?, ?, ?)",
+                [(key, current[key] + amount, keys[key]) for key, amount in update(current).items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, now: float) -> None:
+        self._connect().execute("DELETE FROM quota_counter WHERE expires_at < ?", (now,))
+
+
+class QuotaManager:
+    """
+    Per-subject quotas: "user:<id>" for logged-in users, "ip:<address>"
+    for guests, with limits taken from the subject's tier.
+
+    - requests: sliding window over the last minute, estimated from the
+      current and previous fixed minute (prev * overlap + current)
+    - characters and tokens: daily budgets, reset at midnight UTC
+
+    A request is checked and counted in one backend transaction, so all
+    workers sharing the backend see the same totals. A request that could
+    not be served (AI service unavailable) is refunded.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LocalQuotaBackend()
+        self._calls = 0
+        self.allowed = 0
+        self.refunded = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _check(self, subject: str, tier: str, chars: int, tokens: int, now: float) -> QuotaCharge:
+        limits = TIERS[tier]
+        window = int(now // WINDOW_SECONDS)
+        elapsed = now - window * WINDOW_SECONDS
+        day = int(now // DAY_SECONDS)
+        next_day = (day + 1) * DAY_SECONDS
+
+        current_key = f"{subject}:req:{window}"
+        previous_key = f"{subject}:req:{window - 1}"
+        chars_key = f"{subject}:chars:{day}"
+        tokens_key = f"{subject}:tokens:{day}"
+        keys = {
+            current_key: (window + 2) * WINDOW_SECONDS,
+            previous_key: (window + 1) * WINDOW_SECONDS,
+            chars_key: next_day,
+            tokens_key: next_day,
+        }
+        amounts = {current_key: 1, chars_key: chars, tokens_key: tokens}
+
+        def update(counters: Dict[str, float]) -> Dict[str, float]:
+            previous, current = counters[previous_key], counters[current_key]
+            overlap = 1 - elapsed / WINDOW_SECONDS
+            if previous * overlap + current + 1 > limits.requests_per_minute:
+                # When the previous minute has decayed enough, or the next window starts
+                if previous and current + 1 <= limits.requests_per_minute:
+                    wait = WINDOW_SECONDS * (1 - (limits.requests_per_minute - current - 1) / previous) - elapsed
+                else:
+                    wait = WINDOW_SECONDS - elapsed
+                raise QuotaExceeded(
+                    "requests",
+                    f"Rate limit exceeded ({limits.requests_per_minute} requests per minute)",
+                    retry_after=max(1.0, wait),
+                )
+            if counters[chars_key] + chars > limits.daily_chars:
+                raise QuotaExceeded(
+                    "chars", f"Daily character quota exceeded ({limits.daily_chars})", retry_after=next_day - now
+                )
+            if counters[tokens_key] + tokens > limits.daily_tokens:
+                raise QuotaExceeded(
+                    "tokens", f"Daily token quota exceeded ({limits.daily_tokens})", retry_after=next_day - now
+                )
+            return amounts
+
+        self.backend.apply(keys, update, now)
+        return QuotaCharge({key: keys[key] for key in amounts}, amounts)
+
+    def _consume(self, subject: str, tier: str, chars: int, tokens: int) -> QuotaCharge:
+        now = time.time()
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self.backend.prune(now)
+        try:
+            charge = self._check(subject, tier, chars, tokens, now)
+        except QuotaExceeded as e:
+            self.rejected[e.kind] = self.rejected.get(e.kind, 0) + 1
+            raise
+        self.allowed += 1
+        return charge
+
+    def _refund(self, charge: QuotaCharge) -> None:
+        def update(counters: Dict[str, float]) -> Dict[str, float]:
+            # Counters that expired meanwhile read as 0 and stay there
+            return {key: -min(amount, counters[key]) for key, amount in charge.amounts.items()}
+
+        self.backend.apply(charge.keys, update, time.time())
+        self.refunded += 1
+
+    async def consume(self, subject: str, tier: str, chars: int, tokens: int) -> QuotaCharge:
+        """Count one request of `chars` characters / `tokens` tokens, or raise QuotaExceeded."""
+        if self.backend.shared:
+            return await asyncio.to_thread(self._consume, subject, tier, chars, tokens)
+        return self._consume(subject, tier, chars, tokens)
+
+    async def refund(self, charge: QuotaCharge) -> None:
+        """Give back what consume() counted for a request that was not served."""
+        if self.backend.shared:
+            await asyncio.to_thread(self._refund, charge)
+        else:
+            self._refund(charge)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "shared" if self.backend.shared else "local",
+            "allowed": self.allowed,
+            "refunded": self.refunded,
+            "rejected": dict(self.rejected),
+        }
+
+
+def create_quota_manager() -> QuotaManager:
+    if settings.QUOTA_BACKEND == "sqlite":
+        return QuotaManager(SQLiteQuotaBackend(settings.QUOTA_DB))
+    return QuotaManager()
+
+
+quota_manager = create_quota_manager()
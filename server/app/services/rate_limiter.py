@@ -0,0 +1,304 @@
+import asyncio
+import sqlite3
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, NamedTuple, Optional, Tuple
+from app.core.config import settings
+
+# name -> (amount, capacity, refill_per_second)
+BucketCosts = Dict[str, Tuple[float, float, float]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token) used for TPM accounting."""
+    return max(1, len(text) // 4)
+
+
+def _refill_and_take(
+    levels: Dict[str, Tuple[float, float]], costs: BucketCosts, now: float
+) -> float:
+    """
+    Shared token-bucket math for every backend.
+    `levels` maps bucket name -> (level, updated_at) and is updated in place.
+    Tokens are taken from all buckets or from none.
+    Returns 0 when granted, otherwise the seconds until it could be.
+    """
+    wait = 0.0
+    refilled = {}
+    for name, (amount, capacity, rate) in costs.items():
+        level, updated = levels.get(name, (capacity, now))
+        level = min(capacity, level + max(0.0, now - updated) * rate)
+        refilled[name] = level
+        amount = min(amount, capacity)  # Oversized requests wait for a full bucket
+        if level < amount:
+            wait = max(wait, (amount - level) / rate)
+
+    for name, (amount, capacity, rate) in costs.items():
+        level = refilled[name]
+        if wait == 0.0:
+            level -= min(amount, capacity)
+        levels[name] = (level, now)
+    return wait
+
+
+class LocalBucketBackend:
+    """Buckets held in process memory. Each worker gets its own quota share."""
+
+    shared = False
+
+    def __init__(self):
+        self._levels: Dict[str, Tuple[float, float]] = {}
+
+    def take(self, costs: BucketCosts) -> float:
+        return _refill_and_take(self._levels, costs, time.monotonic())
+
+
+class SQLiteBucketBackend:
+    """
+    Buckets stored in a local SQLite file so every worker on the host
+    draws from the same quota. BEGIN IMMEDIATE serializes the
+    read-modify-write between processes.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_bucket ("
+                "name TEXT PRIMARY KEY, level REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def take(self, costs: BucketCosts) -> float:
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ",".join("?" for _ in costs)
+            rows = conn.execute(
+                f"SELECT name, level, updated_at FROM rate_bucket WHERE name IN ({placeholders})",
+                list(costs),
+            ).fetchall()
+            levels = {name: (level, updated) for name, level, updated in rows}
+            wait = _refill_and_take(levels, costs, time.time())
+            conn.executemany(
+                "INSERT OR REPLACE INTO rate_bucket (name, level, updated_at) VALUES (?, ?, ?)",
+                [(name, level, updated) for name, (level, updated) in levels.items()],
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+
+class QueueRejected(Exception):
+    """A call was turned away by the scheduler instead of waiting longer than its queue allows."""
+
+    def __init__(self, queue: str, retry_after: float):
+        super().__init__(f"AI service is busy ({queue} queue full), retry in {retry_after:.0f}s")
+        self.queue = queue
+        self.retry_after = retry_after
+
+
+class QueueConfig(NamedTuple):
+    weight: int  # Share of the capacity while several queues are waiting
+    max_wait: Optional[float]  # Seconds a call may wait before it is rejected (None: no limit)
+
+
+# Queue used by the Gemini calls of the current request or job
+ai_queue: ContextVar[str] = ContextVar("ai_queue", default="user")
+
+
+class _WaitQueue:
+    def __init__(self, config: QueueConfig):
+        self.config = config
+        self.waiters: Deque[Tuple[int, asyncio.Future]] = deque()  # (tokens, future)
+        self.pass_value = 0.0  # Stride scheduling: lowest pass is served next
+        self.granted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def depth(self) -> int:
+        return sum(1 for _, f in self.waiters if not f.done())
+
+    def head(self) -> Optional[Tuple[int, asyncio.Future]]:
+        while self.waiters and self.waiters[0][1].done():
+            self.waiters.popleft()  # Caller cancelled or timed out while queued
+        return self.waiters[0] if self.waiters else None
+
+
+class RateScheduler:
+    """
+    Token-bucket scheduler for outbound Gemini calls.
+
+    Requests-per-minute and tokens-per-minute buckets refill continuously,
+    so idle capacity is used immediately while bursts are capped at `burst`
+    requests and then smoothed to the configured rate.
+
+    Callers that cannot be served right away wait in their queue (`queues`,
+    e.g. user / guest / background; FIFO within a queue). Queues share the
+    capacity in proportion to their weight (stride scheduling), so a flood
+    in one queue cannot starve the others. A call is rejected with
+    QueueRejected when its expected wait already exceeds the queue's
+    max_wait, or when it has waited that long.
+    """
+
+    def __init__(self, rpm: int, tpm: int, burst: int, backend=None, queues: Optional[Dict[str, QueueConfig]] = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.burst = max(1, burst)
+        self.backend = backend or LocalBucketBackend()
+        self._queues = {
+            name: _WaitQueue(config)
+            for name, config in (queues or {"user": QueueConfig(weight=1, max_wait=None)}).items()
+        }
+        self._virtual_time = 0.0
+        self._pump_task = None
+        self.granted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+
+    def _costs(self, tokens: int) -> BucketCosts:
+        return {
+            "gemini:requests": (1, self.burst, self.rpm / 60),
+            "gemini:tokens": (tokens, self.tpm, self.tpm / 60),
+        }
+
+    async def _try_take(self, tokens: int) -> float:
+        if self.backend.shared:
+            # Shared backends do file I/O; keep it off the event loop
+            return await asyncio.to_thread(self.backend.take, self._costs(tokens))
+        return self.backend.take(self._costs(tokens))
+
+    def _expected_wait(self, queue: _WaitQueue) -> float:
+        """
+        Seconds until a call added to `queue` now would be sent: its own
+        queue plus what the other queues get served meanwhile (their weight
+        ratio, capped at their depth), at the configured request rate.
+        """
+        position = queue.depth() + 1
+        ahead = sum(
+            min(q.depth(), position * q.config.weight / queue.config.weight)
+            for q in self._queues.values() if q is not queue
+        )
+        return (position + ahead) / (self.rpm / 60)
+
+    async def acquire(self, tokens: int = 1, queue: Optional[str] = None) -> None:
+        """
+        Wait until a request carrying `tokens` may be sent.
+        `queue` defaults to the ai_queue of the current context.
+        """
+        name = queue or ai_queue.get()
+        wait_queue = self._queues.get(name) or next(iter(self._queues.values()))
+        if not any(q.depth() for q in self._queues.values()) and await self._try_take(tokens) == 0:
+            wait_queue.granted += 1
+            self.granted += 1
+            return
+
+        max_wait = wait_queue.config.max_wait
+        if max_wait is not None:
+            expected = self._expected_wait(wait_queue)
+            if expected > max_wait:
+                wait_queue.rejected += 1
+                raise QueueRejected(name, expected)
+
+        if not wait_queue.depth():
+            # Idle queues do not bank credit while empty
+            wait_queue.pass_value = max(wait_queue.pass_value, self._virtual_time)
+        future = asyncio.get_running_loop().create_future()
+        wait_queue.waiters.append((tokens, future))
+        self.queued += 1
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.create_task(self._pump())
+
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            wait_queue.rejected += 1
+            raise QueueRejected(name, max_wait)
+        waited = time.monotonic() - started
+        wait_queue.total_wait += waited
+        self.total_wait += waited
+
+    def _next_queue(self) -> Optional[_WaitQueue]:
+        waiting = [q for q in self._queues.values() if q.head() is not None]
+        if not waiting:
+            return None
+        return min(waiting, key=lambda q: (q.pass_value, -q.config.weight))
+
+    async def _pump(self) -> None:
+        while True:
+            wait_queue = self._next_queue()
+            if wait_queue is None:
+                return
+            tokens, future = wait_queue.head()
+            wait = await self._try_take(tokens)
+            if wait == 0:
+                wait_queue.waiters.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    wait_queue.granted += 1
+                    self.granted += 1
+                    self._virtual_time = wait_queue.pass_value
+                    wait_queue.pass_value += 1 / wait_queue.config.weight
+                # Else: cancelled while we took from the bucket; that capacity is lost
+                continue
+            # Re-poll at least once a second: with a shared backend other
+            # workers refill and drain the same bucket.
+            await asyncio.sleep(min(wait, 1.0))
+
+    def stats(self) -> dict:
+        return {
+            "rpm": self.rpm,
+            "tpm": self.tpm,
+            "burst": self.burst,
+            "backend": "sqlite" if self.backend.shared else "local",
+            "queue_depth": sum(q.depth() for q in self._queues.values()),
+            "granted": self.granted,
+            "queued": self.queued,
+            "total_wait_seconds": round(self.total_wait, 3),
+            "queues": {
+                name: {
+                    "weight": q.config.weight,
+                    "max_wait": q.config.max_wait,
+                    "depth": q.depth(),
+                    "granted": q.granted,
+                    "rejected": q.rejected,
+                    "total_wait_seconds": round(q.total_wait, 3),
+                }
+                for name, q in self._queues.items()
+            },
+        }
+
+
+def create_scheduler() -> RateScheduler:
+    if settings.GEMINI_RATE_BACKEND == "sqlite":
+        backend = SQLiteBucketBackend(settings.GEMINI_RATE_DB)
+    else:
+        backend = LocalBucketBackend()
+    return RateScheduler(
+        rpm=settings.GEMINI_RPM,
+        tpm=settings.GEMINI_TPM,
+        burst=settings.GEMINI_RATE_BURST,
+        backend=backend,
+        queues={
+            "user": QueueConfig(settings.GEMINI_QUEUE_USER_WEIGHT, settings.GEMINI_QUEUE_USER_MAX_WAIT),
+            "guest": QueueConfig(settings.GEMINI_QUEUE_GUEST_WEIGHT, settings.GEMINI_QUEUE_GUEST_MAX_WAIT),
+            "background": QueueConfig(
+                settings.GEMINI_QUEUE_BACKGROUND_WEIGHT, settings.GEMINI_QUEUE_BACKGROUND_MAX_WAIT
+            ),
+        },
+    )
+
+
+gemini_scheduler = create_scheduler()
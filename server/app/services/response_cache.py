@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete
+from sqlmodel import Session
+from app.core.config import settings
+from app.core.database import engine
+from app.models.ai_cache import AICacheEntry
+
+_HORIZONTAL_WS = re.compile(r"[ \t\f\v]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text so trivially different inputs share a cache key:
+    NFC unicode, unified line endings, collapsed spaces, trimmed ends.
+    """
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _HORIZONTAL_WS.sub(" ", text)
+    return text.strip()
+
+
+def make_cache_key(operation: str, text: str, target_lang: str = "", version: str = "") -> str:
+    """Content-addressed key: sha256 over the normalized request."""
+    h = hashlib.sha256()
+    for part in (operation, target_lang.strip().lower(), version, normalize_text(text)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LRUCache:
+    """In-memory LRU with per-entry TTL, bounded by entry count and total characters."""
+
+    def __init__(self, max_entries: int, max_chars: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._chars = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[str]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._remove(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_chars:
+            return
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._chars += len(value)
+        while len(self._data) > self.max_entries or self._chars > self.max_chars:
+            self._remove(next(iter(self._data)))
+
+    def _remove(self, key: str) -> None:
+        _, value = self._data.pop(key)
+        self._chars -= len(value)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._chars = 0
+
+
+class ResponseCache:
+    """
+    Two-tier cache for AI results.
+    Tier 1 is the in-process LRU. Tier 2 (optional) is the AICacheEntry
+    table, which survives restarts and is shared by all workers.
+    """
+
+    def __init__(self, max_entries: int, max_chars: int, ttl: int, persistent: bool):
+        self.memory = LRUCache(max_entries, max_chars, ttl)
+        self.ttl = ttl
+        self.persistent = persistent
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _db_get(self, key: str) -> Optional[str]:
+        with Session(engine) as session:
+            entry = session.get(AICacheEntry, key)
+            if entry and entry.expires_at > datetime.utcnow():
+                return entry.value
+        return None
+
+    def _db_set(self, key: str, value: str) -> None:
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            session.merge(AICacheEntry(
+                key=key,
+                value=value,
+                expires_at=now + timedelta(seconds=self.ttl),
+                created_at=now,
+            ))
+            session.commit()
+
+    def _db_prune(self) -> int:
+        with Session(engine) as session:
+            result = session.execute(delete(AICacheEntry).where(AICacheEntry.expires_at <= datetime.utcnow()))
+            session.commit()
+            return result.rowcount
+
+    async def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.persistent:
+            try:
+                value = await asyncio.to_thread(self._db_get, key)
+            except Exception as e:
+                print(f"Error reading AI cache from DB: {e}")
+                value = None
+            if value is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.persistent:
+            try:
+                await asyncio.to_thread(self._db_set, key, value)
+            except Exception as e:
+                print(f"Error writing AI cache to DB: {e}")
+
+    async def prune(self) -> int:
+        """Drop expired rows from the persistent tier."""
+        if not self.persistent:
+            return 0
+        return await asyncio.to_thread(self._db_prune)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "persistent": self.persistent,
+        }
+
+
+response_cache = ResponseCache(
+    max_entries=settings.AI_CACHE_MAX_ENTRIES,
+    max_chars=settings.AI_CACHE_MAX_CHARS,
+    ttl=settings.AI_CACHE_TTL,
+    persistent=settings.AI_CACHE_PERSISTENT,
+)
@@ -0,0 +1,256 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import Column, Integer, MetaData, Table, Text, delete, event, func, inspect, literal_column, text, tuple_
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.core.database import engine
+from app.core.pagination import CursorPage, decode_token, encode_token
+from app.models.history import History, HistorySearchHit
+
+# Full-text index over History, kept next to the table rather than derived
+# from it by triggers: rows are indexed by the application on insert and
+# removed on delete (see index_history / unindex_history).
+#   - SQLite: contentless FTS5 table history_fts, rowid = history.id (the
+#     texts live compressed in History only). The owner column holds
+#     "u<user_id>" so a user's search only walks their own postings.
+#   - PostgreSQL: history_search(history_id, user_id, tsvector) with a GIN index.
+SEARCH_BACKEND = engine.dialect.name if engine.dialect.name in ("sqlite", "postgresql") else None
+SEARCH_TABLE = "history_search" if SEARCH_BACKEND == "postgresql" else "history_fts"
+MAX_TERMS = 16
+SNIPPET_WORDS = 16
+BACKFILL_BATCH_SIZE = 1000
+UNINDEX_BATCH_SIZE = 500
+
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE history_fts USING fts5("
+        "owner, original_text, result_text, content = '', tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        "CREATE TABLE history_search ("
+        "history_id INTEGER PRIMARY KEY REFERENCES history (id) ON DELETE CASCADE, "
+        "user_id INTEGER NOT NULL, document TSVECTOR NOT NULL)",
+        "CREATE INDEX ix_history_search_document ON history_search USING GIN (document)",
+        "CREATE INDEX ix_history_search_user ON history_search (user_id)",
+    ],
+}
+
+# Contentless FTS5 rows are removed by replaying their indexed values
+UNINDEX_SQL = text(
+    "INSERT INTO history_fts (history_fts, rowid, owner, original_text, result_text) "
+    "VALUES ('delete', :id, :owner, :original_text, :result_text)"
+)
+
+INDEX_SQL = {
+    "sqlite": text(
+        "INSERT INTO history_fts (rowid, owner, original_text, result_text) "
+        "VALUES (:id, :owner, :original_text, :result_text)"
+    ),
+    "postgresql": text(
+        "INSERT INTO history_search (history_id, user_id, document) "
+        "VALUES (:id, :user_id, to_tsvector('simple', :original_text || ' ' || :result_text)) "
+        "ON CONFLICT (history_id) DO NOTHING"
+    ),
+}
+
+# Not part of SQLModel.metadata: created by ensure_search_index / migration 0004
+search_metadata = MetaData()
+history_fts = Table(
+    "history_fts", search_metadata,
+    Column("rowid", Integer), Column("owner", Text), Column("original_text", Text), Column("result_text", Text),
+)
+history_search = Table(
+    "history_search", search_metadata,
+    Column("history_id", Integer, primary_key=True), Column("user_id", Integer), Column("document", Text),
+)
+
+
+def _search_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    results = [entry.get("summary_text"), entry.get("translated_text")]
+    return {
+        "id": entry["id"],
+        "user_id": entry["user_id"],
+        "owner": f"u{entry['user_id']}",
+        "original_text": entry.get("original_text") or "",
+        "result_text": " ".join(result for result in results if result),
+    }
+
+
+def index_history(connection: Connection, entries: List[Dict[str, Any]]) -> None:
+    """Add History rows (as dicts, with their id) to the search index."""
+    if SEARCH_BACKEND is None or not entries:
+        return
+    connection.execute(INDEX_SQL[SEARCH_BACKEND], [_search_row(entry) for entry in entries])
+
+
+def unindex_history(connection: Connection, ids: List[int]) -> None:
+    """
+    Remove History rows from the search index. Must run before the rows
+    themselves are deleted: on SQLite their texts are needed to unindex them.
+    """
+    if SEARCH_BACKEND is None or not ids:
+        return
+    if SEARCH_BACKEND == "postgresql":
+        connection.execute(delete(history_search).where(history_search.c.history_id.in_(ids)))
+        return
+    table = History.__table__
+    for start in range(0, len(ids), UNINDEX_BATCH_SIZE):
+        rows = connection.execute(
+            select(table.c.id, table.c.user_id, table.c.original_text, table.c.summary_text, table.c.translated_text)
+            .where(table.c.id.in_(ids[start:start + UNINDEX_BATCH_SIZE]))
+        ).mappings().all()
+        if rows:
+            connection.execute(UNINDEX_SQL, [_search_row(row) for row in rows])
+
+
+# ORM writes (e.g. the job queue, single-item deletes) are indexed in the
+# same flush; bulk core statements call index_history/unindex_history directly.
+@event.listens_for(History, "after_insert")
+def _index_inserted(mapper, connection, target: History) -> None:
+    index_history(connection, [target.model_dump()])
+
+
+@event.listens_for(History, "before_delete")
+def _unindex_deleted(mapper, connection, target: History) -> None:
+    unindex_history(connection, [target.id])
+
+
+def ensure_search_index() -> None:
+    """
+    Create the search index if it does not exist yet and fill it from the
+    existing History rows, in one transaction.
+    """
+    if SEARCH_BACKEND is None:
+        print(f"WARNING: history search is not supported on {engine.dialect.name}")
+        return
+    with Session(engine) as session:
+        if inspect(session.connection()).has_table(SEARCH_TABLE):
+            return
+        for ddl in SEARCH_DDL[SEARCH_BACKEND]:
+            session.execute(text(ddl))
+
+        last_id, indexed = 0, 0
+        while True:
+            rows = session.exec(
+                select(History).where(History.id > last_id).order_by(History.id).limit(BACKFILL_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            index_history(session.connection(), [row.model_dump() for row in rows])
+            last_id, indexed = rows[-1].id, indexed + len(rows)
+        session.commit()
+    print(f"Created history search index ({indexed} rows)")
+
+
+def _search_terms(query: str) -> List[str]:
+    terms = [term for term in query.split() if any(ch.isalnum() for ch in term)]
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search query must contain at least one word")
+    return terms[:MAX_TERMS]
+
+
+def _fts_query(user_id: int, terms: List[str]) -> str:
+    """
+    FTS5 MATCH expression: every term quoted (so user input is never parsed
+    as query syntax), a trailing * kept as a prefix search, restricted to
+    the text columns and to the user's own rows.
+    """
+    phrases = []
+    for term in terms:
+        phrase = '"' + term.rstrip("*").replace('"', '""') + '"'
+        phrases.append(phrase + "*" if term.endswith("*") else phrase)
+    return f'owner : "u{user_id}" AND {{original_text result_text}} : ({" AND ".join(phrases)})'
+
+
+def _snippet(value: str, terms: List[str]) -> str:
+    """Excerpt of `value` around the first matching term, matches in [brackets]."""
+    words = value.split()
+    stems = [term.rstrip("*").lower() for term in terms]
+    start = next((i for i, word in enumerate(words) if any(stem in word.lower() for stem in stems)), 0)
+    start = max(0, start - SNIPPET_WORDS // 4)
+    excerpt = [
+        f"[{word}]" if any(stem in word.lower() for stem in stems) else word
+        for word in words[start:start + SNIPPET_WORDS]
+    ]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SNIPPET_WORDS < len(words) else ""
+    return prefix + " ".join(excerpt) + suffix
+
+
+async def search_history(
+    session: AsyncSession,
+    user_id: int,
+    query: str,
+    action_type: Optional[str] = None,
+    target_lang: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    per_page: int = 20,
+) -> CursorPage[HistorySearchHit]:
+    """
+    Ranked full-text search over a user's history, best matches first.
+
+    Pages are cursor based: the cursor encodes the (rank, id) of the last
+    hit and the next page seeks past it. Pages are only stable while the
+    index does not change: on SQLite, bm25 uses term statistics of the whole
+    index, so rows indexed or deleted between two pages (by any user) shift
+    the scores and the next page can repeat or skip hits.
+    """
+    if SEARCH_BACKEND is None:
+        raise HTTPException(status_code=501, detail="History search is not available on this database")
+    per_page = min(max(per_page, 1), 100)
+    terms = _search_terms(query)
+
+    if SEARCH_BACKEND == "sqlite":
+        fts = literal_column("history_fts")
+        # bm25() is lower for better matches; the owner column carries no weight
+        rank = func.bm25(fts, 0.0, 1.0, 1.0)
+        statement = (
+            select(History, rank)
+            .join(history_fts, history_fts.c.rowid == History.id)
+            .where(fts.op("MATCH")(_fts_query(user_id, terms)))
+        )
+    else:
+        ts_query = func.websearch_to_tsquery("simple", " ".join(terms))
+        rank = -func.ts_rank(history_search.c.document, ts_query)
+        statement = (
+            select(History, rank)
+            .join(history_search, history_search.c.history_id == History.id)
+            .where(history_search.c.user_id == user_id, history_search.c.document.op("@@")(ts_query))
+        )
+
+    statement = statement.where(History.user_id == user_id)
+    if action_type:
+        statement = statement.where(History.action_type == action_type)
+    if target_lang:
+        statement = statement.where(History.target_lang == target_lang)
+    if date_from:
+        statement = statement.where(History.created_at >= date_from)
+    if date_to:
+        statement = statement.where(History.created_at < date_to)
+
+    if cursor:
+        try:
+            last_rank, last_id = decode_token(cursor)
+            last_rank, last_id = float(last_rank), int(last_id)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        statement = statement.where(tuple_(rank, History.id) > tuple_(last_rank, last_id))
+
+    # Fetch one extra row to know if there is a next page
+    statement = statement.order_by(rank, History.id).limit(per_page + 1)
+    rows = (await session.exec(statement)).all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_token([rows[-1][1], rows[-1][0].id])
+
+    items = [
+        HistorySearchHit(item=item, score=-row_rank, snippet=_snippet(item.original_text, terms))
+        for item, row_rank in rows
+    ]
+    return CursorPage(items=items, per_page=per_page, next_cursor=next_cursor)
@@ -0,0 +1,76 @@
+"""initial schema
+
+Tables as created by SQLModel.metadata.create_all before migrations were
+introduced. Existing databases already have them; they are only created
+when missing, so `alembic upgrade head` works on both.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    if not _has_table("user"):
+        op.create_table(
+            "user",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("hashed_password", sa.String(), nullable=False),
+        )
+        op.create_index("ix_user_email", "user", ["email"], unique=True)
+
+    if not _has_table("history"):
+        op.create_table(
+            "history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=False),
+            sa.Column("action_type", sa.String(), nullable=False),
+            sa.Column("original_text", sa.String(), nullable=False),
+            sa.Column("summary_text", sa.String(), nullable=True),
+            sa.Column("translated_text", sa.String(), nullable=True),
+            sa.Column("target_lang", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+
+    if not _has_table("passwordreset"):
+        op.create_table(
+            "passwordreset",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("code", sa.String(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_passwordreset_email", "passwordreset", ["email"])
+
+    if not _has_table("systemconfig"):
+        op.create_table(
+            "systemconfig",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("value", sa.String(), nullable=False),
+            sa.Column("description", sa.String(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("systemconfig")
+    op.drop_index("ix_passwordreset_email", table_name="passwordreset")
+    op.drop_table("passwordreset")
+    op.drop_table("history")
+    op.drop_index("ix_user_email", table_name="user")
+    op.drop_table("user")
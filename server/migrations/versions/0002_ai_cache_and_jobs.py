@@ -0,0 +1,54 @@
+"""ai response cache and background jobs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    if not _has_table("aicacheentry"):
+        op.create_table(
+            "aicacheentry",
+            sa.Column("key", sa.String(), primary_key=True),
+            sa.Column("value", sa.String(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_aicacheentry_expires_at", "aicacheentry", ["expires_at"])
+
+    if not _has_table("job"):
+        op.create_table(
+            "job",
+            sa.Column("id", sa.String(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=True),
+            sa.Column("action_type", sa.String(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("payload", sa.String(), nullable=False),
+            sa.Column("result", sa.String(), nullable=True),
+            sa.Column("error", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_job_user_id", "job", ["user_id"])
+        op.create_index("ix_job_status", "job", ["status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_status", table_name="job")
+    op.drop_index("ix_job_user_id", table_name="job")
+    op.drop_table("job")
+    op.drop_index("ix_aicacheentry_expires_at", table_name="aicacheentry")
+    op.drop_table("aicacheentry")
@@ -0,0 +1,40 @@
+"""composite indexes for history listing and password reset lookups
+
+- history (user_id, created_at, id): /history, newest first, keyset pages
+- history (user_id, action_type, created_at, id): /history/summaries, /history/translations
+- passwordreset (email, code, expires_at): reset code verification
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_history_user_created", "history", ["user_id", "created_at", "id"]),
+    ("ix_history_user_action_created", "history", ["user_id", "action_type", "created_at", "id"]),
+    ("ix_passwordreset_email_code_expires", "passwordreset", ["email", "code", "expires_at"]),
+]
+
+
+def _index_names(table: str) -> set:
+    return {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        # create_all may already have built it on a fresh database
+        if name not in _index_names(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
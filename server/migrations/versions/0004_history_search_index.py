@@ -0,0 +1,57 @@
+"""full-text search index over history
+
+- SQLite: FTS5 table history_fts (rowid = history.id)
+- PostgreSQL: history_search (history_id, user_id, tsvector) with a GIN index
+
+Both are kept in sync by the application (app/services/search_service.py),
+not by triggers.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite" and not _has_table("history_fts"):
+        op.execute(
+            "CREATE VIRTUAL TABLE history_fts USING fts5("
+            "owner, original_text, result_text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO history_fts (rowid, owner, original_text, result_text) "
+            "SELECT id, 'u' || user_id, original_text, "
+            "trim(coalesce(summary_text, '') || ' ' || coalesce(translated_text, '')) FROM history"
+        )
+    elif dialect == "postgresql" and not _has_table("history_search"):
+        op.execute(
+            "CREATE TABLE history_search ("
+            "history_id INTEGER PRIMARY KEY REFERENCES history (id) ON DELETE CASCADE, "
+            "user_id INTEGER NOT NULL, document TSVECTOR NOT NULL)"
+        )
+        op.execute("CREATE INDEX ix_history_search_document ON history_search USING GIN (document)")
+        op.execute("CREATE INDEX ix_history_search_user ON history_search (user_id)")
+        op.execute(
+            "INSERT INTO history_search (history_id, user_id, document) "
+            "SELECT id, user_id, to_tsvector('simple', original_text || ' ' || "
+            "coalesce(summary_text, '') || ' ' || coalesce(translated_text, '')) FROM history"
+        )
+
+
+def downgrade() -> None:
+    if _has_table("history_fts"):
+        op.execute("DROP TABLE history_fts")
+    if _has_table("history_search"):
+        op.execute("DROP TABLE history_search")
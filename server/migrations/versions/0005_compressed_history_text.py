@@ -0,0 +1,134 @@
+"""compressed history texts and light list preview
+
+- history.preview: first 200 characters of original_text, readable without
+  decompressing anything (light list views)
+- history.original_text / summary_text / translated_text become binary
+  columns holding a version byte + zlib-compressed or raw UTF-8 text
+  (app/core/compression.py); existing rows are rewritten
+- SQLite: history_fts becomes contentless, so it no longer keeps a plain
+  copy of every text
+- SQLite: history columns are reordered so the small ones come first
+
+Reclaim the freed space afterwards with VACUUM (SQLite) or VACUUM FULL history (PostgreSQL).
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+import zlib
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+TEXT_COLUMNS = ("original_text", "summary_text", "translated_text")
+PREVIEW_CHARS = 200
+COMPRESS_MIN_BYTES = 256
+BATCH_SIZE = 500
+RAW, ZLIB = 0x00, 0x01
+COLUMN_ORDER = (
+    "id", "user_id", "action_type", "target_lang", "created_at", "preview",
+    "original_text", "summary_text", "translated_text",
+)
+FTS_COLUMNS = (
+    "owner, original_text, result_text, {content}tokenize = 'unicode61 remove_diacritics 2'"
+)
+FTS_SELECT = (
+    "SELECT id, 'u' || user_id, original_text, "
+    "trim(coalesce(summary_text, '') || ' ' || coalesce(translated_text, '')) FROM history"
+)
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if value[0] == ZLIB:
+        return zlib.decompress(value[1:]).decode("utf-8")
+    return value[1:].decode("utf-8")
+
+
+def _compress(value):
+    if value is None:
+        return None
+    raw = value.encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw)
+        if len(packed) < len(raw):
+            return bytes([ZLIB]) + packed
+    return bytes([RAW]) + raw
+
+
+def _rewrite(encode) -> None:
+    """Re-encode every history text with `encode`, in batches by id."""
+    bind = op.get_bind()
+    history = sa.table("history", sa.column("id"), *(sa.column(name) for name in TEXT_COLUMNS))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(history).where(history.c.id > last_id).order_by(history.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            sa.update(history).where(history.c.id == sa.bindparam("row_id")),
+            [
+                {"row_id": row.id, **{name: encode(_to_text(getattr(row, name))) for name in TEXT_COLUMNS}}
+                for row in rows
+            ],
+        )
+        last_id = rows[-1].id
+
+
+def _rebuild_fts(contentless: bool) -> None:
+    if not sa.inspect(op.get_bind()).has_table("history_fts"):
+        return
+    op.execute("DROP TABLE history_fts")
+    content = "content = '', " if contentless else ""
+    op.execute(f"CREATE VIRTUAL TABLE history_fts USING fts5({FTS_COLUMNS.format(content=content)})")
+    op.execute(f"INSERT INTO history_fts (rowid, owner, original_text, result_text) {FTS_SELECT}")
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("history")}
+    if "preview" in columns:
+        return  # create_all already built the new layout
+    op.add_column("history", sa.Column("preview", sa.String(), nullable=True))
+    op.execute(f"UPDATE history SET preview = substr(original_text, 1, {PREVIEW_CHARS})")
+
+    if dialect == "sqlite":
+        _rebuild_fts(contentless=True)  # Index from the plain texts, before they are compressed
+        _rewrite(_compress)  # SQLite stores the bytes as-is in the old columns
+        with op.batch_alter_table("history", recreate="always", partial_reordering=[COLUMN_ORDER]) as batch:
+            for name in TEXT_COLUMNS:
+                batch.alter_column(name, type_=sa.LargeBinary(), existing_type=sa.String())
+    else:
+        for name in TEXT_COLUMNS:
+            op.execute(
+                f"ALTER TABLE history ALTER COLUMN {name} TYPE BYTEA "
+                f"USING decode('00', 'hex') || convert_to({name}, 'UTF8')"
+            )
+        _rewrite(_compress)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _rewrite(lambda value: value)  # Back to plain text
+        with op.batch_alter_table("history", recreate="always") as batch:
+            for name in TEXT_COLUMNS:
+                batch.alter_column(name, type_=sa.String(), existing_type=sa.LargeBinary())
+            batch.drop_column("preview")
+        _rebuild_fts(contentless=False)
+    else:
+        _rewrite(lambda value: None if value is None else bytes([RAW]) + value.encode("utf-8"))
+        for name in TEXT_COLUMNS:
+            op.execute(
+                f"ALTER TABLE history ALTER COLUMN {name} TYPE VARCHAR "
+                f"USING convert_from(substring({name} from 2), 'UTF8')"
+            )
+        op.drop_column("history", "preview")